@@ -0,0 +1,14 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+import resource
+import sys
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process in MB.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return usage / (1024 * 1024) if sys.platform == "darwin" else usage / 1024
@@ -0,0 +1,106 @@
+"""
+Accuracy parity and latency/RSS comparison of the torch and ONNX (int8) inference backends.
+
+    python -m benchmarks.onnx_parity --articles 200
+
+The first ONNX run exports and quantizes both models into ONNX_MODEL_DIR.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.common import peak_rss_mb
+from benchmarks.sentiment_benchmark import make_articles
+from modules.model_registry import load_embedding_model, load_sentiment_model
+from modules.sentiment_analyser1 import score_texts
+
+BACKENDS = ["torch", "onnx"]
+
+
+def best_time(fn, repeats):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def measure(backend, texts, batch_size, repeats):
+    """
+    Load both models for a backend and time sentiment scoring and embedding of `texts`.
+    """
+    encoder = load_embedding_model(backend)
+    sentiment_model = load_sentiment_model(backend)
+
+    # Warm-up pass so lazy initialisation is not measured
+    score_texts(texts[:2], batch_size, sentiment_model)
+    encoder.encode(texts[:2])
+
+    sentiment_time, scores = best_time(lambda: score_texts(texts, batch_size, sentiment_model), repeats)
+    embed_time, embeddings = best_time(lambda: np.asarray(encoder.encode(texts, batch_size=batch_size)), repeats)
+    return {"sentiment_seconds": sentiment_time, "embed_seconds": embed_time}, scores, embeddings
+
+
+def rss_in_subprocess(backend, args):
+    """
+    Peak RSS of a fresh process that loads and runs one backend, so the numbers don't mix.
+    """
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.onnx_parity", "--measure-rss", backend,
+         "--articles", str(args.articles), "--batch-size", str(args.batch_size)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])["peak_rss_mb"]
+
+
+def compare(args, texts):
+    timings, scores, embeddings = {}, {}, {}
+    for backend in BACKENDS:
+        timings[backend], scores[backend], embeddings[backend] = measure(backend, texts, args.batch_size, args.repeats)
+
+    label_agreement = np.mean([a[0] == b[0] for a, b in zip(scores["torch"], scores["onnx"])])
+    score_diff = max(abs(a[1] - b[1]) for a, b in zip(scores["torch"], scores["onnx"]))
+
+    reference, quantized = embeddings["torch"], embeddings["onnx"]
+    cosine = np.sum(reference * quantized, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(quantized, axis=1)
+    )
+
+    print(f"Texts: {len(texts)}, batch size {args.batch_size}")
+    print("\nParity (onnx int8 vs torch fp32)")
+    print(f"  FinBERT label agreement:     {label_agreement * 100:.1f}%")
+    print(f"  FinBERT max |score| diff:    {score_diff:.4f}")
+    print(f"  MiniLM cosine mean / min:    {cosine.mean():.4f} / {cosine.min():.4f}")
+
+    print("\nLatency (best of {})".format(args.repeats))
+    for backend in BACKENDS:
+        t = timings[backend]
+        print(f"  {backend:<6} FinBERT {t['sentiment_seconds'] * 1000:8.1f} ms   MiniLM {t['embed_seconds'] * 1000:8.1f} ms")
+
+    if not args.skip_rss:
+        print("\nPeak RSS (separate process per backend)")
+        for backend in BACKENDS:
+            print(f"  {backend:<6} {rss_in_subprocess(backend, args):8.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="torch vs ONNX int8: accuracy parity, latency and RSS")
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--skip-rss", action="store_true")
+    parser.add_argument("--measure-rss", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    texts = [article["content"] for article in make_articles(args.articles)]
+
+    if args.measure_rss:
+        measure(args.measure_rss, texts, args.batch_size, 1)
+        print(json.dumps({"peak_rss_mb": peak_rss_mb()}))
+    else:
+        compare(args, texts)
@@ -0,0 +1,65 @@
+import argparse
+import random
+import time
+
+from modules.sentiment_analyser1 import analyze_sentiment, analyze_sentiment_sequential, clear_score_cache
+
+SENTENCES = [
+    "Shares of the company rose after quarterly profit beat analyst estimates.",
+    "The board approved a dividend payout and a share buyback programme.",
+    "Revenue growth slowed as demand weakened in key export markets.",
+    "The stock fell sharply after the regulator opened an investigation.",
+    "Management kept its full-year guidance unchanged.",
+    "Brokerages raised their target price citing strong order inflows.",
+]
+
+
+def make_articles(n, seed=0):
+    """
+    Build synthetic NewsAPI-shaped articles of varying length.
+    """
+    rng = random.Random(seed)
+    articles = []
+    for i in range(n):
+        content = " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 12)))
+        articles.append({"title": f"Article {i}", "content": content, "url": f"https://example.com/{i}"})
+    return articles
+
+
+def run(fn, articles, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        results = fn(articles)
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FinBERT sentiment throughput: sequential loop vs batched path")
+    parser.add_argument("--articles", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    articles = make_articles(args.articles)
+
+    # Warm-up pass so lazy initialisation is not measured
+    analyze_sentiment(articles[:2])
+
+    seq_time, seq_results = run(analyze_sentiment_sequential, articles, args.repeats)
+    # Clear the per-article score cache so every repeat runs the model
+    batch_time, batch_results = run(
+        lambda a: clear_score_cache() or analyze_sentiment(a, args.batch_size), articles, args.repeats
+    )
+
+    mismatches = sum(
+        1 for s, b in zip(seq_results, batch_results)
+        if s["sentiment"] != b["sentiment"] or abs(s["score"] - b["score"]) > 1e-3
+    )
+
+    print(f"Articles:   {len(articles)}")
+    print(f"Sequential: {seq_time:.3f}s  ({len(articles) / seq_time:.1f} articles/s)")
+    print(f"Batched:    {batch_time:.3f}s  ({len(articles) / batch_time:.1f} articles/s)")
+    print(f"Speed-up:   {seq_time / batch_time:.2f}x")
+    print(f"Label/score mismatches: {mismatches}")
@@ -0,0 +1,229 @@
+"""
+Local stand-ins for the external services used by the workflows, for offline benchmarks.
+
+Each stub sleeps for a configurable latency and returns data shaped like the
+real service, so the app's own code (caches, pools, parsing, graph scheduling)
+still runs unchanged:
+
+- yfinance: `price_store.yf` is replaced by StubYFinance (synthetic daily bars)
+- NewsAPI: the pooled requests session and httpx client get stub transports
+- LLMs: the clients inside the rate-limited wrappers are replaced by StubChatModel
+- models (optional): hashed embeddings and a fixed-cost sentiment scorer
+"""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import numpy as np
+import pandas as pd
+import requests
+from langchain_core.messages import AIMessage
+from requests.adapters import BaseAdapter
+
+EMBEDDING_DIM = 384
+
+# Wire stories repeat across outlets; every third article is a near-copy of the previous one
+NEWS_SENTENCES = [
+    "{name} reported quarterly revenue ahead of analyst estimates.",
+    "Brokerages raised their target price on {name} citing a strong order book.",
+    "{name} shares slipped as margins came under pressure from input costs.",
+    "The board of {name} approved an interim dividend.",
+    "Analysts expect {name} to benefit from rising domestic demand.",
+]
+
+
+class Latency:
+    """
+    Injected latency, in seconds, of each stubbed service.
+    """
+
+    def __init__(self, llm=0.5, news=0.2, yfinance=0.15, model=0.0):
+        self.llm = llm
+        self.news = news
+        self.yfinance = yfinance
+        self.model = model
+
+
+# -------------------- yfinance --------------------
+def synthetic_bars(symbol, days=60):
+    # Daily bars ending today, in the exchange time zone like yfinance's NSE history
+    index = pd.date_range(end=pd.Timestamp.now(tz="Asia/Kolkata").normalize(), periods=days, freq="D")
+    seed = int(hashlib.md5(symbol.encode("utf-8")).hexdigest()[:8], 16)
+    closes = 1000 + np.cumsum(np.random.default_rng(seed).normal(0, 10, days))
+    return pd.DataFrame({
+        "Open": closes - 2, "High": closes + 5, "Low": closes - 5, "Close": closes,
+        "Volume": np.full(days, 100000), "Dividends": 0.0, "Stock Splits": 0.0
+    }, index=index)
+
+
+class StubTicker:
+    def __init__(self, symbol, latency):
+        self.symbol = symbol
+        self.latency = latency
+
+    def history(self, period=None, start=None, **kwargs):
+        time.sleep(self.latency.yfinance)
+        bars = synthetic_bars(self.symbol)
+        if start is not None:
+            bars = bars[bars.index >= pd.Timestamp(start, tz=bars.index.tz)]
+        return bars
+
+
+class StubYFinance:
+    """
+    Replacement for the `yfinance` module: Ticker(...).history() and multi-ticker download().
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def Ticker(self, symbol):
+        return StubTicker(symbol, self.latency)
+
+    def download(self, tickers, period=None, start=None, group_by="column", **kwargs):
+        time.sleep(self.latency.yfinance)
+        frames = {symbol: StubTicker(symbol, Latency(yfinance=0)).history(start=start) for symbol in tickers}
+        frame = pd.concat(frames, axis=1)
+        return frame if group_by == "ticker" else frame.swaplevel(axis=1).sort_index(axis=1)
+
+
+# -------------------- NewsAPI --------------------
+def news_payload(query, count=20):
+    name = query.split(" OR ")[0].strip('"') or "The company"
+    now = datetime.now(timezone.utc)
+    articles = []
+    for i in range(count):
+        sentence = NEWS_SENTENCES[(i - (i % 3 == 2)) % len(NEWS_SENTENCES)].format(name=name)
+        articles.append({
+            "title": f"{name} update {i}",
+            "content": " ".join([sentence] * 8),
+            "url": f"https://news.example.com/{abs(hash(name)) % 10000}/{i}",
+            "publishedAt": (now - timedelta(hours=i)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        })
+    return {"status": "ok", "totalResults": count, "articles": articles}
+
+
+class StubNewsAdapter(BaseAdapter):
+    """
+    requests transport adapter answering NewsAPI calls locally.
+    """
+
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+
+    def send(self, request, **kwargs):
+        time.sleep(self.latency.news)
+        query = requests.utils.urlparse(request.url).query
+        params = dict(pair.split("=", 1) for pair in query.split("&") if "=" in pair)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(news_payload(requests.utils.unquote_plus(params.get("q", "")))).encode("utf-8")
+        response.headers["Content-Type"] = "application/json"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def stub_news_transport(latency):
+    """
+    httpx transport answering NewsAPI calls locally, for the async client.
+    """
+    async def handler(request):
+        await asyncio.sleep(latency.news)
+        return httpx.Response(200, json=news_payload(request.url.params.get("q", "")))
+
+    return httpx.MockTransport(handler)
+
+
+# -------------------- LLMs --------------------
+class StubChatModel:
+    """
+    Chat model returning a fixed reply after `latency.llm` seconds.
+
+    Batched watchlist prompts (one "### SYMBOL" block per stock) get the
+    reply for every symbol as the JSON object they ask for.
+    """
+
+    def __init__(self, latency, reply, model_name="stub-llm"):
+        self.latency = latency
+        self.reply = reply
+        self.model_name = model_name
+
+    def _answer(self, prompt):
+        symbols = re.findall(r"^\s*### (\S+)$", str(prompt), flags=re.MULTILINE)
+        if not symbols:
+            return AIMessage(content=self.reply)
+        return AIMessage(content=json.dumps({
+            symbol: {"summary": self.reply, "insights": self.reply} for symbol in symbols
+        }))
+
+    def invoke(self, prompt, *args, **kwargs):
+        time.sleep(self.latency.llm)
+        return self._answer(prompt)
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        await asyncio.sleep(self.latency.llm)
+        return self._answer(prompt)
+
+
+# -------------------- Models --------------------
+class HashEmbedder:
+    """
+    SentenceTransformer stand-in: deterministic unit vectors seeded by the text hash.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def _vector(self, text):
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        vector = np.random.default_rng(seed).normal(size=EMBEDDING_DIM)
+        return vector / np.linalg.norm(vector)
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        time.sleep(self.latency.model)
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(text) for text in texts]) if texts else np.zeros((0, EMBEDDING_DIM))
+
+
+def stub_score_texts(latency):
+    def score_texts(texts, max_batch_size=None):
+        time.sleep(latency.model)
+        return [(len(text) % 3, 0.9) for text in texts]
+    return score_texts
+
+
+def install(latency, stub_models=False):
+    """
+    Point every external call of both workflows at the local stubs.
+
+    Must be called after the app modules are imported (it patches their globals).
+    """
+    from modules import price_store, news_fetcher, utils, llm_insights
+    import portfolio_workflow
+
+    price_store.yf = StubYFinance(latency)
+
+    news_fetcher._session.mount("https://newsapi.org", StubNewsAdapter(latency))
+    news_fetcher._async_client = httpx.AsyncClient(transport=stub_news_transport(latency))
+
+    # Swap the client inside the rate-limited wrappers so the limiter still runs
+    utils.llm.llm = StubChatModel(latency, "TCS", "stub-gemini")
+    llm_insights.llm.llm = StubChatModel(latency, "- Revenue grew.\n- Margins held.\n\nAction: hold.")
+    portfolio_workflow.llm.llm = StubChatModel(latency, "- Well diversified.\n- Consider bonds.")
+
+    if stub_models:
+        from modules import embedding, sentiment_analyser1
+        embedder = HashEmbedder(latency)
+        embedding.get_embedding_model = lambda: embedder
+        # Looked up at call time by both the direct path and the micro-batching server
+        sentiment_analyser1.score_texts = stub_score_texts(latency)
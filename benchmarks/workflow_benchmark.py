@@ -0,0 +1,202 @@
+"""
+Offline latency/throughput benchmark of the stock and portfolio workflows.
+
+yfinance, NewsAPI and the LLM clients are replaced by local stubs with
+injected latency (see benchmarks/stubs.py); with --stub-models the embedding
+and FinBERT models are stubbed too, so the run needs neither network access
+nor downloaded weights. The vector store runs in memory and all state is
+written to a temporary directory.
+
+    python -m benchmarks.workflow_benchmark --iterations 20 --concurrency 8 --stub-models
+"""
+import argparse
+import asyncio
+import csv
+import os
+import tempfile
+import time
+from collections import defaultdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from benchmarks.common import peak_rss_mb
+
+QUERIES = [
+    "How is TCS doing?",
+    "Should I buy Infosys?",
+    "Latest news on Reliance Industries",
+    "What is the outlook for HDFC Bank?",
+]
+
+PORTFOLIO = {
+    "portfolio": [
+        {"symbol": "TCS", "quantity": 10},
+        {"symbol": "INFY", "quantity": 15},
+        {"symbol": "HDFCBANK", "quantity": 8},
+        {"symbol": "RELIANCE", "quantity": 5},
+    ],
+    "risk": "Moderate",
+}
+
+
+def configure_environment(args):
+    """
+    Point every store at a scratch directory and disable caches unless --warm-caches.
+
+    Must run before the app modules are imported, they read these at import time.
+    """
+    scratch = tempfile.mkdtemp(prefix="deepstock-bench-")
+    os.environ.setdefault("OPENROUTER_API_KEY", "offline")
+    os.environ.setdefault("GEMINI_API_KEY", "offline")
+    os.environ.setdefault("CHROMA_MODE", "memory")
+    os.environ.setdefault("PRICE_STORE_DIR", os.path.join(scratch, "prices"))
+    os.environ.setdefault("HISTORY_DB_PATH", os.path.join(scratch, "history.db"))
+    os.environ.setdefault("SECTOR_CACHE_PATH", os.path.join(scratch, "sector_cache.json"))
+    # The stubs stand in for the providers, so their rate limits should not throttle the run
+    os.environ.setdefault("LLM_REQUESTS_PER_MIN", "1000000")
+    os.environ.setdefault("LLM_TOKENS_PER_MIN", "1000000000")
+    if not args.warm_caches:
+        os.environ.setdefault("LLM_CACHE_TTL", "0")
+        os.environ.setdefault("NEWS_CACHE_TTL", "0")
+        os.environ.setdefault("PRICE_REFRESH_SECONDS", "0")
+        os.environ.setdefault("SINGLE_FLIGHT_WINDOW", "0")
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def summary(values):
+    return f"p50 {percentile(values, 0.5) * 1000:8.1f} ms   p95 {percentile(values, 0.95) * 1000:8.1f} ms"
+
+
+class NodeTimer(BaseCallbackHandler):
+    """
+    Callback recording the wall time of every LangGraph node run.
+    """
+    run_inline = True
+
+    def __init__(self):
+        self.starts = {}
+        self.timings = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        node = (metadata or {}).get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self.starts[run_id] = (node, time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        started = self.starts.pop(run_id, None)
+        if started:
+            self.timings[started[0]].append(time.perf_counter() - started[1])
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.starts.pop(run_id, None)
+
+
+async def bench_workflow(name, workflow, inputs, iterations):
+    """
+    Run a workflow sequentially and report per-node and end-to-end latency.
+    """
+    timer = NodeTimer()
+    totals = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await workflow.ainvoke(inputs(i), config={"callbacks": [timer]})
+        totals.append(time.perf_counter() - start)
+
+    print(f"\n{name} ({iterations} runs)")
+    for node, values in timer.timings.items():
+        print(f"  {node:<28} {summary(values)}")
+    print(f"  {'end-to-end':<28} {summary(totals)}")
+
+
+async def bench_query_throughput(app, total, concurrency):
+    """
+    Fire `total` POST /query calls, at most `concurrency` at a time, through the ASGI app.
+    """
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        async def one(i):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/query", json={"user_query": QUERIES[i % len(QUERIES)]})
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    print(f"\n/query throughput ({total} requests, concurrency {concurrency})")
+    print(f"  {'requests/s':<28} {total / elapsed:8.2f}   errors {errors}")
+    print(f"  {'latency':<28} {summary(latencies)}")
+
+
+async def bench_watchlist(count):
+    """
+    Screen `count` bundled NSE symbols with one analyze_watchlist call.
+    """
+    from modules.ticker_resolver import SYMBOLS_PATH
+    from modules.watchlist import analyze_watchlist
+
+    with open(SYMBOLS_PATH, encoding="utf-8") as f:
+        symbols = [row["symbol"] for row in csv.DictReader(f)][:count]
+
+    start = time.perf_counter()
+    results = await analyze_watchlist(symbols)
+    elapsed = time.perf_counter() - start
+
+    print(f"\nWatchlist ({len(symbols)} symbols)")
+    print(f"  {'wall time':<28} {elapsed * 1000:8.1f} ms   errors {sum('error' in r for r in results)}")
+
+
+async def main(args):
+    configure_environment(args)
+
+    from benchmarks import stubs
+    from langgraph_workflow import workflow
+    from portfolio_workflow import portfolio_workflow
+    from modules.charts import shutdown_pool
+    import main as app_module
+
+    latency = stubs.Latency(llm=args.llm_latency, news=args.news_latency,
+                            yfinance=args.yfinance_latency, model=args.model_latency)
+    stubs.install(latency, stub_models=args.stub_models)
+
+    try:
+        await bench_workflow("Stock workflow", workflow,
+                             lambda i: {"user_query": QUERIES[i % len(QUERIES)]}, args.iterations)
+        await bench_workflow("Portfolio workflow", portfolio_workflow, lambda i: PORTFOLIO, args.iterations)
+        await bench_query_throughput(app_module.app, args.requests, args.concurrency)
+        if args.watchlist:
+            await bench_watchlist(args.watchlist)
+    finally:
+        shutdown_pool()
+
+    # The chart render workers are separate processes and not included
+    print(f"\nPeak RSS: {peak_rss_mb():.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark of both workflows with stubbed services")
+    parser.add_argument("--iterations", type=int, default=20, help="sequential runs per workflow")
+    parser.add_argument("--requests", type=int, default=32, help="total /query calls in the throughput run")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent /query calls")
+    parser.add_argument("--watchlist", type=int, default=0, help="also screen this many symbols via /watchlist's batch path")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--news-latency", type=float, default=0.2)
+    parser.add_argument("--yfinance-latency", type=float, default=0.15)
+    parser.add_argument("--model-latency", type=float, default=0.0,
+                        help="per-call latency of the stubbed models (with --stub-models)")
+    parser.add_argument("--stub-models", action="store_true",
+                        help="replace the embedding and FinBERT models with cheap stand-ins")
+    parser.add_argument("--warm-caches", action="store_true",
+                        help="keep the news/price/LLM caches enabled (measures the cached path)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,107 @@
+import argparse
+import os
+import sys
+import time
+
+# The LLM clients are built at import time and need a key, even though they are never called here
+os.environ.setdefault("OPENROUTER_API_KEY", "offline")
+os.environ.setdefault("GEMINI_API_KEY", "offline")
+# Each run should pay for its own fetches instead of reusing the previous run's
+os.environ.setdefault("SINGLE_FLIGHT_WINDOW", "0")
+
+import langgraph_workflow
+
+# Simulated latency (seconds) of each node's external call
+DEFAULT_DELAYS = {
+    "extract_stock_symbol": 0.05,
+    "fetch_stock_data": 0.3,
+    "generate_chart": 0.3,
+    "fetch_news": 0.4,
+    "embed_news": 0.2,
+    "similarity_search": 0.05,
+    "sentiment_analysis": 0.3,
+    "summarize_news": 0.6,
+    "generate_insights": 0.5,
+}
+
+ARTICLES = [
+    {"title": f"Article {i}", "content": f"Company news item {i}.", "url": f"https://example.com/{i}"}
+    for i in range(7)
+]
+
+
+def install_stubs(delays, calls):
+    """
+    Replace every external call made by the workflow nodes with a sleep of the given length.
+    """
+    def stub(node, result):
+        def fn(*args, **kwargs):
+            start = time.perf_counter()
+            time.sleep(delays[node])
+            calls.append((node, start, time.perf_counter()))
+            return result
+        return fn
+
+    langgraph_workflow.extract_stock_symbol = stub("extract_stock_symbol", "tcs")
+    langgraph_workflow.get_stock_data = stub("fetch_stock_data", [{"Open": 1, "Close": 1, "High": 1, "Low": 1, "Volume": 1}])
+    langgraph_workflow.get_stock_news = stub("fetch_news", ARTICLES)
+    langgraph_workflow.embed_and_store_news = stub("embed_news", {"embedded_news": ARTICLES})
+    langgraph_workflow.search_similar_articles = stub("similarity_search", ARTICLES)
+    langgraph_workflow.analyze_sentiment = stub("sentiment_analysis", [])
+    langgraph_workflow.generate_news_summary = stub("summarize_news", "summary")
+    langgraph_workflow.generate_stock_insights = stub("generate_insights", "insights")
+    langgraph_workflow.prerender_price_chart = stub("generate_chart", ("etag", None))
+
+
+def critical_path(delays):
+    """
+    Expected wall time of the fanned-out graph: the longest dependency chain.
+    """
+    news_branch = (delays["fetch_news"] + delays["embed_news"] + delays["similarity_search"]
+                   + max(delays["sentiment_analysis"], delays["summarize_news"]))
+    return (delays["extract_stock_symbol"]
+            + max(delays["fetch_stock_data"], delays["generate_chart"], news_branch)
+            + delays["generate_insights"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stock workflow latency with stubbed external calls")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every stub delay")
+    parser.add_argument("--max-ratio", type=float, default=0.8,
+                        help="Fail unless the wall time is below this fraction of the strict chain")
+    args = parser.parse_args()
+
+    delays = {node: delay * args.scale for node, delay in DEFAULT_DELAYS.items()}
+    calls = []
+    install_stubs(delays, calls)
+
+    serial = sum(delays.values())
+    walls = []
+    for _ in range(args.runs):
+        calls.clear()
+        start = time.perf_counter()
+        result = langgraph_workflow.workflow.invoke({"user_query": "insights about TCS"})
+        walls.append(time.perf_counter() - start)
+
+    wall = min(walls)
+    overlapping = sum(
+        1 for i, (_, s1, e1) in enumerate(calls) for (_, s2, e2) in calls[i + 1:]
+        if s1 < e2 and s2 < e1
+    )
+
+    print(f"Strict chain (sum of node delays): {serial:.2f}s")
+    print(f"Expected critical path:            {critical_path(delays):.2f}s")
+    print(f"Measured wall time (best of {args.runs}):  {wall:.2f}s  ({serial / wall:.2f}x faster)")
+    print(f"Overlapping node pairs in last run: {overlapping}")
+    print(f"Insights present: {bool(result.get('insights'))}, chart present: {bool(result.get('chart_url'))}")
+
+    # Exit non-zero so the run fails if the branches stop overlapping or an output goes missing
+    failures = []
+    if wall >= serial * args.max_ratio:
+        failures.append(f"wall time {wall:.2f}s is not below {args.max_ratio:.0%} of the strict chain ({serial:.2f}s)")
+    if not result.get("insights") or not result.get("chart_url"):
+        failures.append("insights or chart_url missing from the result")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
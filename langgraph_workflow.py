@@ -1,17 +1,23 @@
-from langgraph.graph import StateGraph
+from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from pydantic import BaseModel
 from typing import Optional
-import matplotlib.pyplot as plt
-import io, base64
-import yfinance as yf
 
-from modules.stock_data import get_stock_data
-from modules.news_fetcher import get_stock_news
+from modules.stock_data import get_stock_data, normalize_symbol
+from modules.charts import prerender_price_chart, chart_url
+from modules.news_fetcher import get_stock_news, aget_stock_news
 from modules.embedding import embed_and_store_news
 from modules.chromadb_handler import search_similar_articles
-from modules.llm_insights import generate_news_summary, generate_stock_insights
-from modules.utils import extract_stock_symbol
+from modules.llm_insights import (
+    generate_news_summary, generate_stock_insights,
+    agenerate_news_summary, agenerate_stock_insights
+)
+from modules.utils import extract_stock_symbol, aextract_stock_symbol
 from modules.sentiment_analyser1 import analyze_sentiment
+from modules.context_compression import compress_context
+from modules.executors import run_blocking, run_batched
+from modules.tracing import traced
+from modules.single_flight import symbol_flights
 
 import os
 os.environ["HF_HUB_DISABLE_SYMLINKS_WARNING"] = "1"
@@ -25,10 +31,18 @@ class StockWorkflowState(BaseModel):
     news_articles: list = None
     embedded_news: list = None
     similar_articles: list = None
+    context_articles: list = None
+    context_stats: dict = None
     sentiment_results: list = None
     news_summary: str = None
     insights: str = None
-    chart_base64: Optional[str] = None
+    chart_url: Optional[str] = None
+
+
+def flight_key(stage, state):
+    # Ingestion steps depend only on the symbol, so concurrent queries for one ticker share them;
+    # search, compression, sentiment and the LLM steps stay per query
+    return stage, normalize_symbol(state.stock_symbol)
 
 # Define state functions
 def extract_symbol(state: StockWorkflowState):
@@ -36,30 +50,36 @@ def extract_symbol(state: StockWorkflowState):
     return {"stock_symbol": symbol}
 
 def fetch_data(state: StockWorkflowState):
-    data = get_stock_data(state.stock_symbol)
+    data = symbol_flights.do(flight_key("stock_data", state), lambda: get_stock_data(state.stock_symbol))
     if not data:
         raise ValueError(f"No stock data found for symbol: {state.stock_symbol}")
     return {"stock_data": data}
 
 
 def fetch_news(state: StockWorkflowState):
-    articles = get_stock_news(state.stock_symbol)
+    articles = symbol_flights.do(flight_key("news", state), lambda: get_stock_news(state.stock_symbol))
     return {"news_articles": articles}
 
 def embed_news(state: StockWorkflowState):
-    embed_and_store_news(state.news_articles)  # Replace `None` with actual client if needed
+    symbol_flights.do(
+        flight_key("embed", state), lambda: embed_and_store_news(state.news_articles, state.stock_symbol)
+    )
     return {"embedded_news": state.news_articles}
 
 def search_similar(state: StockWorkflowState):
-    results = search_similar_articles(state.user_query)
+    results = search_similar_articles(state.user_query, state.stock_symbol, include_embeddings=True)
     return {"similar_articles": results}
 
+def compress(state: StockWorkflowState):
+    articles, stats = compress_context(state.similar_articles)
+    return {"context_articles": articles, "context_stats": stats}
+
 def sentiment_step(state):
     analyzed = analyze_sentiment(state.similar_articles)
     return {"sentiment_results": analyzed}
 
 def summarize(state: StockWorkflowState):
-    summary = generate_news_summary(state.similar_articles)
+    summary = generate_news_summary(state.context_articles)
     return {"news_summary": summary}
 
 def generate_insights(state: StockWorkflowState):
@@ -67,38 +87,77 @@ def generate_insights(state: StockWorkflowState):
     return {"insights": insights}
 
 def generate_chart(state: StockWorkflowState):
-    import yfinance as yf, matplotlib.pyplot as plt, io, base64
-
     # Clean symbol
-    stock_symbol = state.stock_symbol.strip().replace(" ", "").upper()
-    if not stock_symbol.endswith(".NS"):
-        stock_symbol += ".NS"
+    stock_symbol = normalize_symbol(state.stock_symbol)
 
-    stock = yf.Ticker(stock_symbol)
-    hist = stock.history(period="60d")
+    # Start rendering in the chart worker pool; the client fetches the PNG from /chart/{symbol}
+    try:
+        rendered = prerender_price_chart(stock_symbol)
+    except Exception as e:
+        # The chart is optional, a render pool failure must not fail the query
+        print(f"Error rendering chart for {stock_symbol}: {e}")
+        return {"chart_url": ""}
 
-    if hist.empty:
+    if rendered is None:
         print(f"No data found for {stock_symbol}")
-        return {"chart_base64": ""}
+        return {"chart_url": ""}
+
+    return {"chart_url": chart_url(stock_symbol)}
+
+
+# Async variants: network calls are awaited and CPU-bound inference runs on the bounded pool
+async def aextract_symbol(state: StockWorkflowState):
+    symbol = await aextract_stock_symbol(state.user_query)
+    return {"stock_symbol": symbol}
+
+async def afetch_data(state: StockWorkflowState):
+    data = await symbol_flights.ado(
+        flight_key("stock_data", state), lambda: run_blocking(get_stock_data, state.stock_symbol)
+    )
+    if not data:
+        raise ValueError(f"No stock data found for symbol: {state.stock_symbol}")
+    return {"stock_data": data}
+
+async def afetch_news(state: StockWorkflowState):
+    articles = await symbol_flights.ado(flight_key("news", state), lambda: aget_stock_news(state.stock_symbol))
+    return {"news_articles": articles}
+
+async def aembed_news(state: StockWorkflowState):
+    await symbol_flights.ado(
+        flight_key("embed", state),
+        lambda: run_batched(embed_and_store_news, state.news_articles, state.stock_symbol)
+    )
+    return {"embedded_news": state.news_articles}
+
+async def asearch_similar(state: StockWorkflowState):
+    return await run_batched(search_similar, state)
 
-    closes = hist.tail(30)["Close"]
-    dates = closes.index.strftime("%Y-%m-%d").tolist()
+async def acompress(state: StockWorkflowState):
+    return await run_blocking(compress, state)
+
+async def asentiment_step(state):
+    return await run_batched(sentiment_step, state)
+
+async def asummarize(state: StockWorkflowState):
+    summary = await agenerate_news_summary(state.context_articles)
+    return {"news_summary": summary}
+
+async def agenerate_insights(state: StockWorkflowState):
+    insights = await agenerate_stock_insights(state.stock_data, state.news_summary)
+    return {"insights": insights}
 
-    plt.style.use("seaborn-v0_8")
-    fig, ax = plt.subplots(figsize=(10, 6))
-    ax.plot(dates, closes.values, marker="o", linestyle="-", color="blue")
-    ax.set_title(f"{stock_symbol} - Last 30 Closing Prices")
-    ax.set_xlabel("Date")
-    ax.set_ylabel("Closing Price (INR)")
-    fig.autofmt_xdate()
+async def agenerate_chart(state: StockWorkflowState):
+    return await run_blocking(generate_chart, state)
 
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
 
-    chart_base64 = base64.b64encode(buf.read()).decode("utf-8")
-    return {"chart_base64": chart_base64}
+def add_node(graph, name, func, afunc):
+    """
+    Register a sync/async node pair so `workflow.invoke` and `workflow.ainvoke` each use the
+    matching variant; both are traced under the node name (see modules/tracing.py).
+    """
+    graph.add_node(name, RunnableLambda(
+        traced("stock", name, func), afunc=traced("stock", name, afunc), name=func.__name__
+    ))
 
 
 
@@ -106,26 +165,36 @@ def generate_chart(state: StockWorkflowState):
 graph = StateGraph(StockWorkflowState)
 
 # Add states
-graph.add_node("extract_stock_symbol", extract_symbol)
-graph.add_node("fetch_stock_data", fetch_data)
-graph.add_node("generate_chart", generate_chart)
-graph.add_node("fetch_news", fetch_news)
-graph.add_node("embed_news", embed_news)
-graph.add_node("similarity_search", search_similar)
-graph.add_node("sentiment_analysis", sentiment_step)
-graph.add_node("summarize_news", summarize)
-graph.add_node("generate_insights", generate_insights)
+add_node(graph, "extract_stock_symbol", extract_symbol, aextract_symbol)
+add_node(graph, "fetch_stock_data", fetch_data, afetch_data)
+add_node(graph, "generate_chart", generate_chart, agenerate_chart)
+add_node(graph, "fetch_news", fetch_news, afetch_news)
+add_node(graph, "embed_news", embed_news, aembed_news)
+add_node(graph, "similarity_search", search_similar, asearch_similar)
+add_node(graph, "compress_context", compress, acompress)
+add_node(graph, "sentiment_analysis", sentiment_step, asentiment_step)
+add_node(graph, "summarize_news", summarize, asummarize)
+add_node(graph, "generate_insights", generate_insights, agenerate_insights)
 
 # Define transitions
+# Independent branches fan out and run concurrently in the same step:
+#   symbol -> stock data | chart | news -> embed -> search -> compress -> sentiment | summary
+# and generate_insights waits for both the stock data and the news summary.
 graph.set_entry_point("extract_stock_symbol")
 graph.add_edge("extract_stock_symbol", "fetch_stock_data")
-graph.add_edge("fetch_stock_data", "generate_chart")
-graph.add_edge("generate_chart", "fetch_news")
+graph.add_edge("extract_stock_symbol", "generate_chart")
+graph.add_edge("extract_stock_symbol", "fetch_news")
 graph.add_edge("fetch_news", "embed_news")
 graph.add_edge("embed_news", "similarity_search")
-graph.add_edge("similarity_search", "sentiment_analysis")
-graph.add_edge("sentiment_analysis", "summarize_news")
-graph.add_edge("summarize_news", "generate_insights")
+# sentiment hangs off compress_context (it still scores every retrieved article) so it
+# shares a step with summarize_news instead of delaying it by one
+graph.add_edge("similarity_search", "compress_context")
+graph.add_edge("compress_context", "sentiment_analysis")
+graph.add_edge("compress_context", "summarize_news")
+graph.add_edge(["fetch_stock_data", "summarize_news"], "generate_insights")
+graph.add_edge("generate_chart", END)
+graph.add_edge("sentiment_analysis", END)
+graph.add_edge("generate_insights", END)
 
 # Compile the workflow
 workflow = graph.compile()
@@ -1,19 +1,31 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi.responses import HTMLResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from typing import Optional,List
 import os
+import json
+import asyncio
 
 from langgraph_workflow import workflow
 from portfolio_workflow import portfolio_workflow # your compiled graph
+from modules.model_registry import warm_up, memory_report
+from modules.news_fetcher import close_async_client
+from modules.charts import prerender_price_chart, sector_chart, shutdown_pool, CHART_MAX_AGE
+from modules.stock_data import normalize_symbol
+from modules.executors import run_blocking
+from modules.history_store import history_store, DEFAULT_SESSION, HISTORY_PAGE_SIZE
+from modules.tracing import start_request_timings, metrics_payload
+from modules.watchlist import analyze_watchlist, WATCHLIST_MAX_SYMBOLS
+from modules import prewarm, vector_retention
 
 # Load environment variables
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 NEWSAPI_KEY = os.getenv("NEWSAPI_KEY")
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "false").lower() == "true"
 
 app = FastAPI(title="Stock Insights Chatbot API")
 
@@ -23,13 +35,44 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Jinja2 templates
 templates = Jinja2Templates(directory="templates")
 
-# In-memory chat history
-chat_history = []
+
+@app.on_event("startup")
+def load_models():
+    """
+    Optionally load the shared models and vector store before serving traffic.
+    """
+    if WARMUP_MODELS:
+        print(f"Models warmed up: {warm_up()}")
+
+
+@app.on_event("startup")
+async def start_prewarm():
+    """
+    Refresh the PREWARM_SYMBOLS watchlist in the background so its queries hit warm caches.
+    """
+    prewarm.start()
+
+
+@app.on_event("startup")
+async def start_compaction():
+    """
+    Periodically apply the news vector store retention policy (see modules/vector_retention.py).
+    """
+    vector_retention.start()
+
+
+@app.on_event("shutdown")
+async def close_clients():
+    await prewarm.stop()
+    await vector_retention.stop()
+    await close_async_client()
+    shutdown_pool()
 
 
 # Request schema
 class QueryRequest(BaseModel):
     user_query: str
+    include_timings: bool = False
 
 
 # Response schema
@@ -37,14 +80,20 @@ class QueryResponse(BaseModel):
     query: str
     stock_symbol: str
     stock_data: list | None
-    chart_base64: Optional[str] = None
+    chart_url: Optional[str] = None
     news_summary: str | None
     insights: str | None
     sentiment_results: list | None
+    context_stats: Optional[dict] = None
+    timings: Optional[dict] = None
+
+class WatchlistRequest(BaseModel):
+    symbols: List[str]
+    query: Optional[str] = None
 
 class StockInput(BaseModel):
     symbol: str
-    quantity: int
+    quantity: int = Field(gt=0)
 
 class PortfolioRequest(BaseModel):
     portfolio: List[StockInput]
@@ -77,13 +126,47 @@ def dashboard(request: Request):
     return templates.TemplateResponse("portfolio.html", {"request": request})
 
 
+@app.get("/models")
+def get_models():
+    """
+    Report load time and approximate memory of each loaded model/client.
+    """
+    return {"models": memory_report()}
+
+
+@app.get("/prewarm/status")
+def prewarm_status():
+    """
+    Age of the prewarmed prices, news, embeddings and sentiment per watchlist symbol.
+    """
+    return prewarm.status()
+
+
+@app.get("/vector-store/stats")
+def vector_store_stats():
+    """
+    Size, estimated index memory and retention evictions of the news embeddings collection.
+    """
+    return vector_retention.stats()
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus metrics: per-node durations, errors and output sizes, LLM latency and prompt sizes.
+    """
+    body, content_type = metrics_payload()
+    return Response(content=body, media_type=content_type)
+
+
 @app.post("/query", response_model=QueryResponse)
-def run_query(request: QueryRequest):
+async def run_query(request: QueryRequest, x_session_id: Optional[str] = Header(None)):
     """
     Endpoint to process a stock query and return insights.
     """
     try:
-        result = workflow.invoke({"user_query": request.user_query})
+        timings = start_request_timings()
+        result = await workflow.ainvoke({"user_query": request.user_query})
 
         response = {
             "query": request.user_query,
@@ -92,31 +175,155 @@ def run_query(request: QueryRequest):
             "news_summary": result.get("news_summary", ""),
             "sentiment_results": result.get("sentiment_results", []),
             "insights": result.get("insights", ""),
-            "chart_base64": result.get("chart_base64", "")
+            "chart_url": result.get("chart_url", ""),
+            "context_stats": result.get("context_stats")
         }
 
-        chat_history.append(response)
+        await run_blocking(history_store.add, x_session_id or DEFAULT_SESSION, response)
+        if request.include_timings:
+            response["timings"] = timings
         return response
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/watchlist")
+async def run_watchlist(request: WatchlistRequest):
+    """
+    Batch variant of /query for a list of symbols: one price download, shared model batches,
+    one LLM call per WATCHLIST_LLM_BATCH_SIZE symbols.
+    """
+    if not request.symbols:
+        raise HTTPException(status_code=400, detail="No symbols given")
+    if len(request.symbols) > WATCHLIST_MAX_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {WATCHLIST_MAX_SYMBOLS} symbols per watchlist")
+
+    try:
+        return {"results": await analyze_watchlist(request.symbols, request.query)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# State fields streamed to the client as soon as the node producing them finishes
+STREAMED_FIELDS = ["stock_symbol", "stock_data", "chart_url", "sentiment_results", "context_stats", "news_summary", "insights"]
+# Nodes whose LLM tokens are forwarded while they are being generated
+TOKEN_NODES = {"summarize_news", "generate_insights"}
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.get("/query/stream")
+async def stream_query(user_query: str, session_id: Optional[str] = None,
+                       x_session_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events variant of /query.
+
+    EventSource can't set headers, so browsers pass the history session as the
+    `session_id` query parameter (X-Session-Id is still accepted).
+
+    Emits one event per graph node as soon as its output is ready (named after
+    the node, carrying only the response fields it produced), `token` events
+    while the summary and insights are generated, then `done` (or `error`).
+    """
+    async def events():
+        result = {}
+        try:
+            async for mode, chunk in workflow.astream(
+                {"user_query": user_query}, stream_mode=["updates", "messages"]
+            ):
+                if mode == "messages":
+                    message, metadata = chunk
+                    node = metadata.get("langgraph_node")
+                    if node in TOKEN_NODES and message.content:
+                        yield sse_event("token", {"node": node, "text": message.content})
+                    continue
+
+                for node, update in chunk.items():
+                    fields = {key: value for key, value in (update or {}).items() if key in STREAMED_FIELDS}
+                    if fields:
+                        result.update(fields)
+                        yield sse_event(node, fields)
+
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+
+        response = {
+            "query": user_query,
+            "stock_symbol": result.get("stock_symbol", "N/A"),
+            "stock_data": result.get("stock_data", []),
+            "news_summary": result.get("news_summary", ""),
+            "sentiment_results": result.get("sentiment_results", []),
+            "insights": result.get("insights", ""),
+            "chart_url": result.get("chart_url", ""),
+            "context_stats": result.get("context_stats")
+        }
+        await run_blocking(history_store.add, session_id or x_session_id or DEFAULT_SESSION, response)
+        yield sse_event("done", {"query": user_query})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def png_response(request: Request, etag, render, max_age):
+    """
+    Serve a rendered chart with ETag/Cache-Control, answering 304 when the client copy is current.
+    """
+    headers = {"ETag": f'"{etag}"', "Cache-Control": f"public, max-age={max_age}"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    png = await asyncio.wrap_future(render)
+    return Response(content=png, media_type="image/png", headers=headers)
+
+
+@app.get("/chart/portfolio/{chart_id}")
+async def get_sector_chart(chart_id: str, request: Request):
+    """
+    Sector pie chart of a portfolio analysis; the id encodes the breakdown, so the PNG never changes.
+    """
+    chart = sector_chart(chart_id)
+    if chart is None:
+        raise HTTPException(status_code=404, detail="Unknown chart id")
+    return await png_response(request, *chart, max_age=86400)
+
+
+@app.get("/chart/{symbol}")
+async def get_chart(symbol: str, request: Request):
+    """
+    Last 30 closing prices of a symbol as a PNG, cached by symbol and last bar.
+    """
+    chart = await run_blocking(prerender_price_chart, normalize_symbol(symbol))
+    if chart is None:
+        raise HTTPException(status_code=404, detail=f"No price data for {symbol}")
+    return await png_response(request, *chart, max_age=CHART_MAX_AGE)
+
+
 @app.get("/history")
-def get_history():
-    return {"history": chat_history}
+def get_history(cursor: Optional[int] = None, limit: int = HISTORY_PAGE_SIZE,
+                x_session_id: Optional[str] = Header(None)):
+    """
+    One page of the session's chat history, newest first; pass `next_cursor` back to get the next page.
+    """
+    return history_store.page(x_session_id or DEFAULT_SESSION, cursor=cursor, limit=limit)
 
 
 @app.delete("/history")
-def clear_history():
-    chat_history.clear()
+def clear_history(x_session_id: Optional[str] = Header(None)):
+    history_store.clear(x_session_id or DEFAULT_SESSION)
     return {"message": "Chat history cleared"}
 
 
 @app.post("/portfolio-analysis")
-def analyze_portfolio(request: PortfolioRequest):
+async def analyze_portfolio(request: PortfolioRequest):
     try:
-        result = portfolio_workflow.invoke({
+        result = await portfolio_workflow.ainvoke({
             "portfolio": [s.dict() for s in request.portfolio],
             "risk": request.risk
         })
@@ -124,7 +331,8 @@ def analyze_portfolio(request: PortfolioRequest):
         return {
             "portfolio": result.get("portfolio", []),
             "sector_breakdown": result.get("sector_breakdown", {}),
-            "sector_chart_base64": result.get("sector_chart_base64", ""),
+            "analytics": result.get("analytics", {}),
+            "sector_chart_url": result.get("sector_chart_url", ""),
             "ai_insights": result.get("ai_insights", ""),
             "recommendations": result.get("recommendations", {})
         }
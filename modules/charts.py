@@ -0,0 +1,194 @@
+import base64
+import binascii
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import quote
+
+from modules.price_store import get_closes
+
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "2"))
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "256"))
+# Browser cache lifetime of a price chart; a new bar changes the ETag anyway
+CHART_MAX_AGE = int(os.getenv("CHART_MAX_AGE", "300"))
+# Upper bounds on a sector chart id, which carries the breakdown itself
+SECTOR_CHART_MAX_ID = 4096
+SECTOR_CHART_MAX_SECTORS = 50
+
+_pool = None
+_pool_lock = threading.Lock()
+_cache = OrderedDict()  # etag -> Future[bytes]
+_cache_lock = threading.Lock()
+
+
+# -------------------- Rendering (runs in worker processes) --------------------
+def _init_worker():
+    # Non-interactive backend and style are set once per worker, not per chart
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    plt.style.use("seaborn-v0_8")
+
+
+def _to_png(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    return buf.getvalue()
+
+
+def render_price_chart(title, dates, closes):
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(dates, closes, marker="o", linestyle="-", color="blue")
+    ax.set_title(title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Closing Price (INR)")
+    fig.autofmt_xdate()
+    return _to_png(fig)
+
+
+def render_sector_chart(sector_data):
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.subplots()
+    ax.pie(list(sector_data.values()), labels=list(sector_data.keys()), autopct="%1.1f%%")
+    ax.axis("equal")
+    return _to_png(fig)
+
+
+# -------------------- Cache --------------------
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool._broken:
+            # A worker died (OOM kill, crash); the executor refuses all further work
+            print("Chart render pool is broken, starting a new one")
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            # spawn: workers must not inherit the parent's model threads and locks
+            _pool = ProcessPoolExecutor(
+                max_workers=CHART_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _submit(fn, *args):
+    try:
+        return _get_pool().submit(fn, *args)
+    except BrokenProcessPool:
+        # Broke between the check and the submit: the retry gets a fresh pool
+        return _get_pool().submit(fn, *args)
+
+
+def _etag(*parts):
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:20]
+
+
+def _cached_render(etag, fn, *args):
+    """
+    Return the (possibly still running) render future for an ETag, submitting it on a miss.
+    """
+    with _cache_lock:
+        future = _cache.get(etag)
+        # Renders cancelled by shutdown_pool or failed ones are submitted again
+        if future is None or future.cancelled() or (future.done() and future.exception() is not None):
+            future = _submit(fn, *args)
+            _cache[etag] = future
+        _cache.move_to_end(etag)
+        while len(_cache) > CHART_CACHE_SIZE:
+            _cache.popitem(last=False)
+        return future
+
+
+def chart_url(symbol):
+    return f"/chart/{quote(symbol, safe='')}"
+
+
+def prerender_price_chart(symbol, count=30):
+    """
+    Start (or reuse) the render of a symbol's last `count` closes.
+
+    The cache key is the symbol plus its last bar date and close, so the PNG
+    is only re-rendered when a new or updated bar arrives.
+
+    Args:
+        symbol (str): yfinance ticker, e.g. "TCS.NS".
+
+    Returns:
+        tuple[str, Future] | None: (etag, future PNG bytes), None if there is no price data.
+    """
+    closes = get_closes(symbol, count=count)
+    if closes.empty:
+        return None
+
+    etag = _etag("price", symbol, str(count), closes.index[-1].strftime("%Y-%m-%d"), f"{closes.iloc[-1]:.4f}")
+    future = _cached_render(
+        etag, render_price_chart,
+        f"{symbol} - Last {count} Closing Prices",
+        closes.index.strftime("%Y-%m-%d").tolist(),
+        closes.tolist()
+    )
+    return etag, future
+
+
+def register_sector_chart(sector_data):
+    """
+    Return the id a sector breakdown's pie chart is served under.
+
+    The id is the breakdown itself (compact JSON, URL-safe base64), so any
+    worker can render it, before or after a restart, without shared state.
+    """
+    payload = json.dumps(sorted(sector_data.items()), separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_sector_chart(chart_id):
+    if len(chart_id) > SECTOR_CHART_MAX_ID:
+        return None
+    try:
+        items = json.loads(base64.urlsafe_b64decode(chart_id + "=" * (-len(chart_id) % 4)))
+        sector_data = {str(sector): float(weight) for sector, weight in items}
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    weights = list(sector_data.values())
+    if not weights or len(weights) > SECTOR_CHART_MAX_SECTORS:
+        return None
+    if not all(math.isfinite(w) and w >= 0 for w in weights) or sum(weights) <= 0:
+        return None
+    return sector_data
+
+
+def sector_chart_url(chart_id):
+    return f"/chart/portfolio/{chart_id}"
+
+
+def sector_chart(chart_id):
+    """
+    Return (etag, future PNG bytes) for a sector chart id, None if it isn't a valid breakdown.
+    """
+    sector_data = _decode_sector_chart(chart_id)
+    if sector_data is None:
+        return None
+    etag = _etag("sector", chart_id)
+    return etag, _cached_render(etag, render_sector_chart, sector_data)
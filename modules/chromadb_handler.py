@@ -1,35 +1,113 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
+import os
+import time
 
-# Initialize ChromaDB client
-client = chromadb.Client()
+import numpy as np
 
-# Create or get a collection
-collection = client.get_or_create_collection(name="news_embeddings")
+from modules.model_registry import get_news_collection
+from modules.embedding import embed_texts
+from modules.stock_data import normalize_symbol
+
+# Only articles published within this many days are searched (0 disables the time filter)
+NEWS_WINDOW_DAYS = int(os.getenv("NEWS_WINDOW_DAYS", "30"))
+
+
+def build_filter(stock_symbol=None, window_days=None):
+    """
+    Build a Chroma `where` filter restricting a search to one symbol and time window.
+
+    Args:
+        stock_symbol (str, optional): Symbol partition to search.
+        window_days (int, optional): Only include articles published in the last N days.
+
+    Returns:
+        dict | None: The filter, or None when no restriction applies.
+    """
+    conditions = []
+    if stock_symbol:
+        conditions.append({"symbol": normalize_symbol(stock_symbol)})
+    if window_days:
+        conditions.append({"published_ts": {"$gte": int(time.time()) - window_days * 86400}})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
 
-# Initialize sentence transformer model for similarity search
-transformer = SentenceTransformer('all-MiniLM-L6-v2')
 
 # Function to perform similarity search for the user query
-def search_similar_articles(query):
-    query_embedding = transformer.encode(query)
+def search_similar_articles(query, stock_symbol=None, window_days=NEWS_WINDOW_DAYS, n_results=7,
+                            include_embeddings=False, query_embedding=None):
+    """
+    Find the stored articles most similar to the query, optionally within one symbol and time window.
+
+    Args:
+        query (str): User query to embed.
+        stock_symbol (str, optional): Restrict the search to this symbol's articles.
+        window_days (int, optional): Restrict the search to recently published articles.
+        n_results (int): Number of articles to return.
+        include_embeddings (bool): Also return each article's stored 'embedding' and
+            its cosine 'relevance' to the query, for context compression.
+        query_embedding (optional): Precomputed embedding of `query`.
+
+    Returns:
+        list[dict]: Articles with 'url', 'content', 'title', 'publishedAt', 'distance'.
+    """
+    if query_embedding is None:
+        query_embedding = embed_texts([query])[0]
 
-    search_results = collection.query(
+    include = ["documents", "metadatas", "distances"]
+    if include_embeddings:
+        include.append("embeddings")
+
+    search_results = get_news_collection().query(
         query_embeddings=[query_embedding],
-        n_results=7
+        n_results=n_results,
+        where=build_filter(stock_symbol, window_days),
+        include=include
     )
 
     articles = []
     for i in range(len(search_results['documents'][0])):
+        metadata = search_results['metadatas'][0][i] or {}
         articles.append({
-            "url": search_results['ids'][0][i],
+            "url": metadata.get("url", search_results['ids'][0][i]),
             "content": search_results['documents'][0][i],
-            "title": search_results['metadatas'][0][i].get("title", "Untitled"),
+            "title": metadata.get("title", "Untitled"),
+            "publishedAt": metadata.get("publishedAt", ""),
             "distance": search_results['distances'][0][i]
         })
 
+    if include_embeddings and articles:
+        embeddings = np.asarray(search_results['embeddings'][0], dtype=float)
+        query_vector = np.asarray(query_embedding, dtype=float)
+        relevance = embeddings @ query_vector / (
+            np.linalg.norm(embeddings, axis=1) * np.linalg.norm(query_vector) + 1e-12
+        )
+        for article, embedding, score in zip(articles, embeddings, relevance):
+            article["embedding"] = embedding.tolist()
+            article["relevance"] = float(score)
+
     return articles
 
 
+def search_similar_batch(queries, window_days=NEWS_WINDOW_DAYS, n_results=7, include_embeddings=False):
+    """
+    Run one similarity search per symbol, encoding all the queries in a single batch.
 
+    Args:
+        queries (dict[str, str]): Query text keyed by the symbol whose articles it searches.
 
+    Returns:
+        dict[str, list[dict]]: Articles per symbol, as returned by search_similar_articles.
+    """
+    if not queries:
+        return {}
+    embeddings = embed_texts(list(queries.values()))
+    return {
+        symbol: search_similar_articles(
+            query, symbol, window_days, n_results,
+            include_embeddings=include_embeddings, query_embedding=embedding
+        )
+        for (symbol, query), embedding in zip(queries.items(), embeddings)
+    }
@@ -0,0 +1,139 @@
+import os
+
+import numpy as np
+
+from modules.rate_limiter import estimate_tokens
+
+# Articles at least this similar (cosine) to one already kept are dropped as copies
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.92"))
+# MMR trade-off: 1.0 ranks purely by relevance, lower values favour articles unlike those already picked
+CONTEXT_MMR_LAMBDA = float(os.getenv("CONTEXT_MMR_LAMBDA", "0.7"))
+# Approximate token budget for the article text sent to the summary prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# A truncated last article is only kept if at least this many tokens of it fit
+MIN_TRUNCATED_TOKENS = 50
+
+# Running totals across requests
+compression_stats = {"requests": 0, "duplicates": 0, "tokens_before": 0, "tokens_after": 0}
+
+
+def article_tokens(article):
+    return estimate_tokens(f"Title: {article['title']}\nContent: {article['content']}")
+
+
+def _normalize(embeddings):
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.where(norms == 0, 1, norms)
+
+
+def drop_near_duplicates(articles, embeddings, threshold=CONTEXT_DEDUP_THRESHOLD):
+    """
+    Keep the first (most relevant) copy of each group of near-identical articles.
+
+    Returns:
+        list[int]: Indices of the articles kept, in input order.
+    """
+    similarity = embeddings @ embeddings.T
+    kept = []
+    for i in range(len(articles)):
+        if all(similarity[i, j] < threshold for j in kept):
+            kept.append(i)
+    return kept
+
+
+def mmr_order(relevance, embeddings, mmr_lambda=CONTEXT_MMR_LAMBDA):
+    """
+    Order articles by maximal marginal relevance.
+
+    Args:
+        relevance (np.ndarray): Similarity of each article to the query.
+        embeddings (np.ndarray): Unit-normalised article embeddings.
+
+    Returns:
+        list[int]: Article indices, best first.
+    """
+    similarity = embeddings @ embeddings.T
+    remaining = list(range(len(relevance)))
+    order = []
+    while remaining:
+        if order:
+            redundancy = similarity[np.ix_(remaining, order)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining))
+        scores = mmr_lambda * relevance[remaining] - (1 - mmr_lambda) * redundancy
+        order.append(remaining.pop(int(np.argmax(scores))))
+    return order
+
+
+def fit_to_budget(articles, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Take articles in order until the budget is spent, truncating the last one that only partly fits.
+    """
+    selected = []
+    remaining = token_budget
+    for article in articles:
+        tokens = article_tokens(article)
+        if tokens <= remaining:
+            selected.append(article)
+            remaining -= tokens
+            continue
+        if remaining >= MIN_TRUNCATED_TOKENS:
+            # estimate_tokens counts ~4 characters per token
+            overhead = article_tokens({**article, "content": ""})
+            content = article['content'][:max(0, (remaining - overhead - 1) * 4)]
+            selected.append({**article, "content": content.rsplit(" ", 1)[0] + " ..."})
+        break
+    return selected
+
+
+def compress_context(articles, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Shrink the retrieved articles before they are summarised.
+
+    Near-duplicates (e.g. the same wire story from several outlets) are
+    dropped by cosine similarity of the embeddings returned by the search,
+    the rest are ordered by MMR and cut to `token_budget` tokens. Articles
+    without embeddings keep their search order and are only budgeted.
+
+    Args:
+        articles (list[dict]): Search results; 'embedding' and 'relevance' are used when present.
+        token_budget (int): Approximate token budget for the article text.
+
+    Returns:
+        tuple[list[dict], dict]: Compressed articles (without embeddings) and
+            stats with 'articles_in', 'duplicates', 'articles_out', 'tokens_before',
+            'tokens_after' and 'tokens_saved'.
+    """
+    tokens_before = sum(article_tokens(article) for article in articles)
+    ordered = list(articles)
+    duplicates = 0
+
+    if articles and all(article.get("embedding") is not None for article in articles):
+        embeddings = _normalize(np.asarray([article["embedding"] for article in articles], dtype=float))
+        kept = drop_near_duplicates(articles, embeddings)
+        duplicates = len(articles) - len(kept)
+
+        relevance = np.asarray([articles[i].get("relevance", 0.0) for i in kept], dtype=float)
+        order = mmr_order(relevance, embeddings[kept])
+        ordered = [articles[kept[i]] for i in order]
+
+    ordered = [{key: value for key, value in article.items() if key != "embedding"} for article in ordered]
+    compressed = fit_to_budget(ordered, token_budget)
+    tokens_after = sum(article_tokens(article) for article in compressed)
+
+    stats = {
+        "articles_in": len(articles),
+        "duplicates": duplicates,
+        "articles_out": len(compressed),
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after
+    }
+    compression_stats["requests"] += 1
+    compression_stats["duplicates"] += duplicates
+    compression_stats["tokens_before"] += tokens_before
+    compression_stats["tokens_after"] += tokens_after
+    print(f"Context compressed: {len(articles)} -> {len(compressed)} articles, "
+          f"{duplicates} duplicates, {stats['tokens_saved']} tokens saved")
+
+    return compressed, stats
@@ -1,25 +1,131 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
+import os
+from datetime import datetime, timezone
 
-# Initialize sentence transformer model
-transformer = SentenceTransformer('all-MiniLM-L6-v2')
+from modules.model_registry import get_embedding_model, get_news_collection
+from modules.stock_data import normalize_symbol
+from modules.micro_batcher import MicroBatcher, MICRO_BATCH_ENABLED
+from modules.vector_retention import retention_cutoff
 
-# Initialize ChromaDB client
-chroma_client = chromadb.Client()
+# Batch size used when encoding new articles in one call
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
 
-# Create or get a collection
-collection = chroma_client.get_or_create_collection(name="news_embeddings")
 
-# Function to embed news articles and store them in ChromaDB
-def embed_and_store_news(news_articles):
-    embeddings = [transformer.encode(article['content']) for article in news_articles]
-
-    for idx, embedding in enumerate(embeddings):
-        collection.add(
-            embeddings=[embedding],
-            metadatas=[{"title": news_articles[idx]['title']}],
-            documents=[news_articles[idx]['content']],
-            ids=[news_articles[idx]['url']]
+def _encode(texts):
+    return get_embedding_model().encode(texts, batch_size=EMBED_BATCH_SIZE)
+
+
+# Encode calls from concurrent requests (articles and search queries) share forward passes
+_embedding_server = MicroBatcher("embedding", _encode, EMBED_BATCH_SIZE)
+
+
+def embed_texts(texts):
+    """
+    Embed a list of texts, through the shared micro-batching server when MICRO_BATCH_ENABLED.
+
+    Returns:
+        np.ndarray: One embedding row per text.
+    """
+    if MICRO_BATCH_ENABLED:
+        return _embedding_server.run(texts)
+    return _encode(texts)
+
+
+def published_timestamp(published_at):
+    """
+    Convert a NewsAPI `publishedAt` string (e.g. "2024-05-01T10:00:00Z") to epoch seconds, 0 if missing.
+    """
+    if not published_at:
+        return 0
+    try:
+        parsed = datetime.fromisoformat(published_at.replace("Z", "+00:00"))
+    except ValueError:
+        return 0
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def article_id(symbol, url):
+    """
+    Build the collection id for an article, scoped to its symbol partition.
+    """
+    return f"{symbol}::{url}"
+
+
+def embed_and_store_batch(articles_by_symbol):
+    """
+    Embed and store the articles of several symbols with one encode call and one upsert.
+
+    Args:
+        articles_by_symbol (dict[str, list[dict]]): Articles keyed by the symbol they were fetched for.
+
+    Returns:
+        dict: 'written' and 'skipped' counts over all symbols.
+    """
+    collection = get_news_collection()
+
+    # Drop articles without an id/content, already past retention, and duplicate URLs within each symbol
+    cutoff = retention_cutoff()
+    candidates = {}
+    total = 0
+    for stock_symbol, news_articles in articles_by_symbol.items():
+        symbol = normalize_symbol(stock_symbol)
+        total += len(news_articles)
+        for article in news_articles:
+            if not (article.get('url') and article.get('content')):
+                continue
+            if cutoff is not None and published_timestamp(article.get('publishedAt')) < cutoff:
+                continue
+            candidates.setdefault(article_id(symbol, article['url']), (symbol, article))
+
+    existing_ids = set()
+    if candidates:
+        existing_ids = set(collection.get(ids=list(candidates), include=[])['ids'])
+
+    new_ids = [doc_id for doc_id in candidates if doc_id not in existing_ids]
+    new_entries = [candidates[doc_id] for doc_id in new_ids]
+
+    if new_entries:
+        embeddings = embed_texts([article['content'] for _, article in new_entries])
+
+        collection.upsert(
+            embeddings=[embedding.tolist() for embedding in embeddings],
+            metadatas=[{
+                "title": article.get('title') or "Untitled",
+                "url": article['url'],
+                "symbol": symbol,
+                "publishedAt": article.get('publishedAt') or "",
+                "published_ts": published_timestamp(article.get('publishedAt'))
+            } for symbol, article in new_entries],
+            documents=[article['content'] for _, article in new_entries],
+            ids=new_ids
         )
 
-    return {"embedded_news": news_articles}
+    written = len(new_entries)
+    skipped = total - written
+    target = next(iter(articles_by_symbol)) if len(articles_by_symbol) == 1 else f"{len(articles_by_symbol)} symbols"
+    print(f"Embedded {written} new articles for {target}, skipped {skipped} already stored or invalid")
+
+    return {"written": written, "skipped": skipped}
+
+
+# Function to embed news articles and store them in ChromaDB
+def embed_and_store_news(news_articles, stock_symbol):
+    """
+    Embed news articles and store them in ChromaDB in bulk.
+
+    Articles whose URL is already stored for this symbol (or repeated within
+    the batch) are skipped, as are articles already older than
+    NEWS_RETENTION_DAYS; the remaining ones are encoded in a single batched
+    call and written with one upsert. Each article is tagged with its symbol
+    and publication time so searches can be filtered to one ticker's news.
+
+    Args:
+        news_articles (list[dict]): Articles with keys 'url', 'title', 'content', 'publishedAt'.
+        stock_symbol (str): Stock symbol the articles were fetched for.
+
+    Returns:
+        dict: The input articles plus 'skipped' and 'written' counts.
+    """
+    counts = embed_and_store_batch({stock_symbol: news_articles})
+    return {"embedded_news": news_articles, **counts}
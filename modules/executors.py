@@ -0,0 +1,107 @@
+import asyncio
+import contextvars
+import functools
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.micro_batcher import MICRO_BATCH_ENABLED
+
+# CPU-bound model inference (embeddings, FinBERT, chart rendering) runs on a small
+# bounded pool so concurrent requests queue up instead of oversubscribing the cores
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+
+_inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+
+
+async def run_inference(fn, *args, **kwargs):
+    """
+    Run a CPU-bound call on the bounded inference pool without blocking the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, fn, *args, **kwargs)
+    return await loop.run_in_executor(_inference_executor, call)
+
+
+async def run_batched(fn, *args, **kwargs):
+    """
+    Run a call whose model work goes through a MicroBatcher (embed_texts, analyze_sentiment).
+
+    With micro-batching on, the forward passes run on the batchers' worker
+    threads and the call mostly waits on their futures, so it goes to the
+    default pool; the bounded pool would cap how many requests can join a
+    batch. With batching off it is ordinary inference.
+    """
+    if MICRO_BATCH_ENABLED:
+        return await run_blocking(fn, *args, **kwargs)
+    return await run_inference(fn, *args, **kwargs)
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Run a blocking I/O call (e.g. yfinance) on the default thread pool.
+    """
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+class PeriodicTask:
+    """
+    Background job on the event loop: run `job()` (a coroutine function) now and then
+    every `interval` seconds, randomised by +/- `jitter`, until stopped.
+
+    A failing run is logged and counted in `stats`; the loop keeps going.
+    """
+
+    def __init__(self, name, job, interval, jitter=0.0):
+        self.name = name
+        self.job = job
+        self.interval = interval
+        self.jitter = jitter
+        self.stats = {"runs": 0, "errors": 0, "last_error": None, "last_run_at": None,
+                      "last_duration": None, "next_run_at": None}
+        self._task = None
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    def next_delay(self):
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def run_forever(self):
+        while True:
+            started = time.time()
+            try:
+                await self.job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"{self.name} failed: {e}")
+                self.stats["errors"] += 1
+                self.stats["last_error"] = str(e)
+
+            delay = self.next_delay()
+            self.stats["runs"] += 1
+            self.stats["last_run_at"] = started
+            self.stats["last_duration"] = round(time.time() - started, 3)
+            self.stats["next_run_at"] = time.time() + delay
+            await asyncio.sleep(delay)
+
+    def start(self):
+        """
+        Start the loop on the running event loop (no-op if it is already running).
+        """
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run_forever())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
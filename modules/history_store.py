@@ -0,0 +1,92 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "chat_history.db")
+# Oldest entries of a session are dropped once it holds more than this many
+HISTORY_MAX_PER_SESSION = int(os.getenv("HISTORY_MAX_PER_SESSION", "100"))
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+DEFAULT_SESSION = "default"
+
+
+class HistoryStore:
+    """
+    Chat history kept in SQLite instead of process memory.
+
+    Each session keeps at most `max_per_session` entries and pages are read
+    with a keyset cursor (the id of the last entry seen), so both memory use
+    and the cost of reading a page stay flat as history grows. Entries only
+    hold the response fields; charts are stored as their /chart URL.
+    """
+
+    def __init__(self, path=HISTORY_DB_PATH, max_per_session=HISTORY_MAX_PER_SESSION):
+        self.max_per_session = max_per_session
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chat_history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+            "created_at REAL NOT NULL, payload TEXT NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS chat_history_session ON chat_history (session_id, id)"
+        )
+        self._db.commit()
+
+    def add(self, session_id, entry):
+        """
+        Append a response to a session and trim the session to its cap.
+        """
+        payload = json.dumps(entry, default=str)
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO chat_history (session_id, created_at, payload) VALUES (?, ?, ?)",
+                (session_id, time.time(), payload)
+            )
+            self._db.execute(
+                "DELETE FROM chat_history WHERE session_id = ? AND id <= ("
+                "SELECT id FROM chat_history WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (session_id, session_id, self.max_per_session)
+            )
+            self._db.commit()
+
+    def page(self, session_id, cursor=None, limit=HISTORY_PAGE_SIZE):
+        """
+        Read one page of a session's history, newest first.
+
+        Args:
+            session_id (str): Session to read.
+            cursor (int, optional): `next_cursor` of the previous page; None for the newest entries.
+            limit (int): Entries per page, capped at HISTORY_MAX_PAGE_SIZE.
+
+        Returns:
+            dict: {"history": [...], "next_cursor": int | None}
+        """
+        limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, created_at, payload FROM chat_history "
+                "WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+                (session_id, cursor if cursor is not None else 2 ** 63 - 1, limit + 1)
+            ).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        history = [{"id": row[0], "created_at": row[1], **json.loads(row[2])} for row in rows]
+        return {"history": history, "next_cursor": rows[-1][0] if has_more else None}
+
+    def clear(self, session_id):
+        with self._lock:
+            deleted = self._db.execute(
+                "DELETE FROM chat_history WHERE session_id = ?", (session_id,)
+            ).rowcount
+            self._db.commit()
+        return deleted
+
+
+# Process-wide store used by main.py
+history_store = HistoryStore()
@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "1800"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+# Optional SQLite file so cached responses survive restarts and are shared between workers
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+
+def content_hash(value):
+    """
+    Stable SHA-256 of any JSON-serialisable value (dict keys sorted).
+    """
+    payload = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def parse_json_response(content, label):
+    """
+    Parse a JSON object answer (optionally wrapped in a ``` fence) keyed by symbol.
+
+    Returns:
+        dict: the answer with keys stripped and upper-cased, {} when it isn't a JSON object.
+    """
+    text = re.sub(r"^```(?:json)?|```$", "", content.strip()).strip()
+    try:
+        answer = json.loads(text)
+    except ValueError:
+        print(f"Could not parse {label}: {content[:200]}")
+        return {}
+    if not isinstance(answer, dict):
+        return {}
+    return {str(key).strip().upper(): value for key, value in answer.items()}
+
+
+class LLMCache:
+    """
+    TTL + LRU cache of LLM responses keyed by model, prompt template and input content.
+
+    Entries live in an in-memory OrderedDict capped at `max_entries`
+    (least recently used evicted first). With a `path`, entries are also
+    written to SQLite and memory misses fall through to disk.
+    """
+
+    def __init__(self, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES, path=LLM_CACHE_PATH):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "disk_hits": 0}
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model, template, inputs):
+        """
+        Build the cache key from the model name, the prompt template text and the prompt inputs.
+        """
+        return content_hash([model, content_hash(template), inputs])
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    self._put(key, row[0], row[1])
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return row[0]
+
+            self.stats["misses"] += 1
+            return None
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._put(key, value, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at)
+                )
+                self._db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+
+    def _put(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+
+# Process-wide cache used by modules/llm_insights.py
+response_cache = LLMCache()
@@ -21,38 +21,163 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 
+from modules.rate_limiter import rate_limited
+from modules.llm_cache import response_cache, parse_json_response
+from modules.single_flight import llm_flights
+
 # # Load environment variables
 # load_dotenv()
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 OPENROUTER_API_KEY=os.getenv("OPENROUTER_API_KEY")
-llm = ChatOpenAI(
+llm = rate_limited(ChatOpenAI(
     model="gpt-4o-mini",
     temperature=0.7,
     base_url="https://openrouter.ai/api/v1",
     api_key=OPENROUTER_API_KEY,
-)
+), "openrouter")
 
 
 
-# Function to generate 5-bullet-point summary of news articles using LLM
-def generate_news_summary(news_articles):
-    article_text = "\n\n".join([f"Title: {article['title']}\nContent: {article['content']}" for article in news_articles])
-    prompt = f"""
+NEWS_SUMMARY_PROMPT = """
     Summarize the following news articles in 5 concise bullet points:
     {article_text}
     JUST GIVE SUMMARY NOT TELL THAT THIS YOUR 5 POINTS SUMMARY JUST PUNE SUMMARY IN 5-6 POINTS
     """
-    response = llm.invoke(prompt)
-    return response.content
 
-# Function to generate stock insights using LLM
-def generate_stock_insights(stock_data, news_summary):
-    prompt = f"""
+STOCK_INSIGHTS_PROMPT = """
     Here is the 7-day stock data and news summary . 
     Please generate a short response summarizing the stock's outlook and suggest an action (buy, hold, sell) based on the data and news.
 
     Stock Data: {stock_data}
     News Summary: {news_summary}
     """
-    response = llm.invoke(prompt)
-    return response.content
+
+WATCHLIST_PROMPT = """
+    For each stock below you get its last closing prices and its most relevant recent news.
+    For every stock write:
+    - "summary": the news in 3-5 concise bullet points (or "No recent news found." if there is none)
+    - "insights": a short outlook based on the prices and news, ending with an action (buy, hold, sell)
+
+    Return ONLY a JSON object mapping each symbol exactly as given to {{"summary": ..., "insights": ...}}, with no other text.
+
+    {stocks}
+    """
+
+
+def _news_summary_prompt(news_articles):
+    article_text = "\n\n".join([f"Title: {article['title']}\nContent: {article['content']}" for article in news_articles])
+    return NEWS_SUMMARY_PROMPT.format(article_text=article_text)
+
+
+def _stock_insights_prompt(stock_data, news_summary):
+    return STOCK_INSIGHTS_PROMPT.format(stock_data=stock_data, news_summary=news_summary)
+
+
+def _model_name():
+    return getattr(llm, "model_name", None) or getattr(llm, "model", "")
+
+
+def _summary_key(news_articles):
+    # Article set identified by URL + title + content, so a changed article invalidates the entry
+    inputs = [[article.get('url'), article['title'], article['content']] for article in news_articles]
+    return response_cache.make_key(_model_name(), NEWS_SUMMARY_PROMPT, inputs)
+
+
+def _insights_key(stock_data, news_summary):
+    return response_cache.make_key(_model_name(), STOCK_INSIGHTS_PROMPT, [stock_data, news_summary])
+
+
+def _complete(key, prompt):
+    # Cache hit, else one LLM call shared by every concurrent caller with the same key
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    def call():
+        response = llm.invoke(prompt)
+        response_cache.set(key, response.content)
+        return response.content
+
+    return llm_flights.do(key, call)
+
+
+async def _acomplete(key, prompt):
+    cached = response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def call():
+        response = await llm.ainvoke(prompt)
+        response_cache.set(key, response.content)
+        return response.content
+
+    return await llm_flights.ado(key, call)
+
+
+def _watchlist_prompt(entries):
+    blocks = []
+    for symbol, entry in entries.items():
+        closes = ", ".join(f"{row['Close']:.2f}" for row in entry["stock_data"]) or "n/a"
+        news = "\n".join(f"- {article['title']}: {article['content']}" for article in entry["articles"]) or "- none"
+        blocks.append(f"### {symbol}\nCloses (oldest first): {closes}\nNews:\n{news}")
+    return WATCHLIST_PROMPT.format(stocks="\n\n".join(blocks))
+
+
+def parse_watchlist_response(symbols, content):
+    """
+    Parse a batched watchlist answer into {symbol: (summary, insights)}; symbols it missed are left out.
+    """
+    answer = parse_json_response(content, "watchlist insights")
+    parsed = {}
+    for symbol in symbols:
+        item = answer.get(symbol.upper())
+        if isinstance(item, dict):
+            parsed[symbol] = (str(item.get("summary") or ""), str(item.get("insights") or ""))
+    return parsed
+
+
+async def agenerate_watchlist_insights(entries):
+    """
+    Summaries and insights for several stocks from one LLM call.
+
+    Args:
+        entries (dict): {symbol: {"stock_data": [...], "articles": [...]}}, articles already compressed.
+
+    Returns:
+        dict: {symbol: (news_summary, insights)} for every symbol the answer covered.
+    """
+    inputs = {
+        symbol: [[row["Close"] for row in entry["stock_data"]],
+                 [[article.get('url'), article['title'], article['content']] for article in entry["articles"]]]
+        for symbol, entry in entries.items()
+    }
+    key = response_cache.make_key(_model_name(), WATCHLIST_PROMPT, inputs)
+    cached = response_cache.get(key)
+    if cached is not None:
+        return parse_watchlist_response(list(entries), cached)
+
+    async def call():
+        response = await llm.ainvoke(_watchlist_prompt(entries))
+        parsed = parse_watchlist_response(list(entries), response.content)
+        # Unparseable answers aren't cached, the next request asks again
+        if parsed:
+            response_cache.set(key, response.content)
+        return parsed
+
+    return await llm_flights.ado(key, call)
+
+
+# Function to generate 5-bullet-point summary of news articles using LLM
+def generate_news_summary(news_articles):
+    return _complete(_summary_key(news_articles), _news_summary_prompt(news_articles))
+
+# Function to generate stock insights using LLM
+def generate_stock_insights(stock_data, news_summary):
+    return _complete(_insights_key(stock_data, news_summary), _stock_insights_prompt(stock_data, news_summary))
+
+# Async variants used by the async workflow path
+async def agenerate_news_summary(news_articles):
+    return await _acomplete(_summary_key(news_articles), _news_summary_prompt(news_articles))
+
+async def agenerate_stock_insights(stock_data, news_summary):
+    return await _acomplete(_insights_key(stock_data, news_summary), _stock_insights_prompt(stock_data, news_summary))
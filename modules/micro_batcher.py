@@ -0,0 +1,116 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from modules.tracing import BATCH_ITEMS
+
+# Coalesce model calls from concurrent requests into shared forward passes
+MICRO_BATCH_ENABLED = os.getenv("MICRO_BATCH_ENABLED", "true").lower() == "true"
+# How long the first queued request waits for others to join its batch
+MICRO_BATCH_MAX_WAIT = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "2")) / 1000
+
+
+class MicroBatcher:
+    """
+    In-process inference server: queues calls from any thread and runs them as one batch.
+
+    `batch_fn` takes a list of items and returns one result per item. A
+    worker thread takes the oldest queued request, adds every request that
+    arrives within `max_wait` (while the batch stays within
+    `max_batch_size` items, requests are never split), runs `batch_fn` once
+    and resolves each caller's future with its slice of the results. At low
+    load a request waits at most `max_wait`; under load, requests queued
+    while a batch runs are picked up together by the next one.
+    """
+
+    def __init__(self, name, batch_fn, max_batch_size, max_wait=MICRO_BATCH_MAX_WAIT):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.stats = {"batches": 0, "requests": 0, "items": 0, "max_requests_per_batch": 0}
+        self._pending = deque()  # (items, future)
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, items):
+        """
+        Queue items for the next batch and return a Future of their results (a list/array slice).
+        """
+        items = list(items)
+        future = Future()
+        if not items:
+            future.set_result([])
+            return future
+
+        with self._cond:
+            self._pending.append((items, future))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name=f"{self.name}-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def run(self, items):
+        """
+        Blocking submit: wait for and return the results of `items`.
+        """
+        return self.submit(items).result()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            batch = [self._pending.popleft()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                if self._pending:
+                    if size + len(self._pending[0][0]) > self.max_batch_size:
+                        break
+                    request = self._pending.popleft()
+                    batch.append(request)
+                    size += len(request[0])
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return batch
+
+    def _loop(self):
+        while True:
+            batch = self._next_batch()
+            items = [item for request_items, _ in batch for item in request_items]
+
+            self.stats["batches"] += 1
+            self.stats["requests"] += len(batch)
+            self.stats["items"] += len(items)
+            self.stats["max_requests_per_batch"] = max(self.stats["max_requests_per_batch"], len(batch))
+            BATCH_ITEMS.labels(self.name).observe(len(items))
+
+            # Anything raised (even a BaseException) fails this batch only; the worker keeps serving
+            try:
+                results = self.batch_fn(items)
+            except BaseException as e:
+                for _, future in batch:
+                    self._settle(future, error=e)
+                continue
+
+            offset = 0
+            for request_items, future in batch:
+                self._settle(future, result=results[offset:offset + len(request_items)])
+                offset += len(request_items)
+
+    @staticmethod
+    def _settle(future, result=None, error=None):
+        # A caller may have cancelled its future while it was queued
+        if not future.set_running_or_notify_cancel():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
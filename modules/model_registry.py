@@ -0,0 +1,142 @@
+import os
+import threading
+import time
+
+os.environ["HF_HUB_DISABLE_SYMLINKS_WARNING"] = "1"
+
+# Model identifiers shared across the app
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+SENTIMENT_MODEL_NAME = "yiyanghkust/finbert-tone"
+NEWS_COLLECTION_NAME = "news_embeddings"
+
+# "torch" runs the models eagerly in fp32, "onnx" runs int8-quantized exports through
+# ONNX Runtime (exported to ONNX_MODEL_DIR on first use, see modules/onnx_backend.py)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+
+# "persistent" keeps the vector index on disk across restarts, "memory" is ephemeral
+CHROMA_MODE = os.getenv("CHROMA_MODE", "persistent").lower()
+CHROMA_PERSIST_DIR = os.getenv("CHROMA_PERSIST_DIR", "chroma store")
+
+# Process-wide cache of loaded resources, filled on first use
+_resources = {}
+_load_stats = {}
+_lock = threading.RLock()
+
+
+def _module_bytes(module):
+    """
+    Approximate resident size of a torch module from its parameters and buffers
+    (the quantized file size for ONNX models).
+    """
+    if hasattr(module, "model_bytes"):
+        return module.model_bytes
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def _get_or_load(name, loader, sizer=None):
+    resource = _resources.get(name)
+    if resource is not None:
+        return resource
+
+    with _lock:
+        # Another thread may have finished loading while we waited
+        if name in _resources:
+            return _resources[name]
+
+        start = time.perf_counter()
+        resource = loader()
+        _load_stats[name] = {
+            "load_seconds": round(time.perf_counter() - start, 3),
+            "memory_bytes": sizer(resource) if sizer else None
+        }
+        _resources[name] = resource
+        return resource
+
+
+def load_embedding_model(backend=INFERENCE_BACKEND):
+    """
+    Load a new embedding model instance for the given backend (uncached, see get_embedding_model).
+    """
+    if backend == "onnx":
+        from modules.onnx_backend import load_sentence_encoder
+        return load_sentence_encoder(EMBEDDING_MODEL_NAME)
+
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def load_sentiment_model(backend=INFERENCE_BACKEND):
+    """
+    Load a new FinBERT (tokenizer, model) pair for the given backend (uncached, see get_sentiment_model).
+    """
+    if backend == "onnx":
+        from modules.onnx_backend import load_sequence_classifier
+        return load_sequence_classifier(SENTIMENT_MODEL_NAME)
+
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    tokenizer = AutoTokenizer.from_pretrained(SENTIMENT_MODEL_NAME)
+    model = AutoModelForSequenceClassification.from_pretrained(SENTIMENT_MODEL_NAME)
+    return tokenizer, model
+
+
+def get_embedding_model():
+    """
+    Return the shared SentenceTransformer (or its ONNX stand-in) used for news embeddings and search.
+    """
+    return _get_or_load("embedding_model", load_embedding_model, _module_bytes)
+
+
+def get_sentiment_model():
+    """
+    Return the shared FinBERT (tokenizer, model) pair.
+    """
+    return _get_or_load("sentiment_model", load_sentiment_model, lambda pair: _module_bytes(pair[1]))
+
+
+def get_chroma_client():
+    """
+    Return the shared ChromaDB client (persistent under CHROMA_PERSIST_DIR unless CHROMA_MODE=memory).
+    """
+    def load():
+        import chromadb
+        if CHROMA_MODE == "memory":
+            return chromadb.Client()
+        return chromadb.PersistentClient(path=CHROMA_PERSIST_DIR)
+
+    return _get_or_load("chroma_client", load)
+
+
+def get_news_collection():
+    """
+    Return the shared news embeddings collection.
+    """
+    return _get_or_load(
+        "news_collection",
+        lambda: get_chroma_client().get_or_create_collection(name=NEWS_COLLECTION_NAME)
+    )
+
+
+def warm_up():
+    """
+    Load every model and client up front, e.g. from the app startup hook,
+    so the first request does not pay the load cost.
+
+    Returns:
+        dict: The memory report after loading.
+    """
+    get_embedding_model().encode(["warm up"])
+    get_sentiment_model()
+    get_news_collection()
+    return memory_report()
+
+
+def memory_report():
+    """
+    Report load time and approximate memory of each resource loaded so far.
+
+    Returns:
+        dict: {resource_name: {"load_seconds": float, "memory_bytes": int | None}}
+    """
+    with _lock:
+        return {name: dict(stats) for name, stats in _load_stats.items()}
@@ -1,7 +1,13 @@
 import os
+import threading
+import time
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
+from modules.ticker_resolver import news_search_term
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -12,38 +18,187 @@ NEWSAPI_KEY = os.getenv("NEWSAPI_KEY")
 NEWSAPI_URL = "https://newsapi.org/v2/everything"
 
 
-# Function to fetch the latest news articles for a given stock symbol using requests
-def get_stock_news(stock_symbol):
-    """
-    Fetch the latest news articles related to a given stock symbol.
+# Shared HTTP clients, so connections are pooled across requests
+NEWSAPI_MAX_CONNECTIONS = int(os.getenv("NEWSAPI_MAX_CONNECTIONS", "20"))
+NEWSAPI_TIMEOUT = float(os.getenv("NEWSAPI_TIMEOUT", "10"))
+_async_client = None
 
-    Args:
-    - stock_symbol (str): The stock symbol or company name to search for in the news.
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=NEWSAPI_MAX_CONNECTIONS))
 
-    Returns:
-    - list: A list of news articles related to the stock symbol.
+# Per-symbol article cache: fresh entries are served without calling NewsAPI,
+# stale ones are topped up with only the articles published since the newest one seen
+NEWS_CACHE_TTL = int(os.getenv("NEWS_CACHE_TTL", "300"))
+NEWS_MAX_ARTICLES = 100
+_cache = {}  # symbol key -> {"articles": [...], "fetched_at": float}
+_cache_lock = threading.Lock()
+news_stats = {"api_calls": 0, "cache_hits": 0, "incremental_calls": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(stat):
+    # Updated from worker threads and the event loop alike
+    with _stats_lock:
+        news_stats[stat] += 1
+
+
+def _cache_key(stock_symbol):
+    return stock_symbol.strip().lower()
+
+
+def _fresh_articles(key, max_age=None):
+    max_age = NEWS_CACHE_TTL if max_age is None else max_age
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and time.time() - entry["fetched_at"] < max_age:
+            _count("cache_hits")
+            return list(entry["articles"])
+    return None
+
+
+def _newest_published(key):
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry and entry["articles"]:
+            return entry["articles"][0].get('publishedAt')
+    return None
+
+
+def _merge_articles(key, new_articles):
+    """
+    Merge fetched articles into the cache, deduplicated by URL and newest first.
     """
+    with _cache_lock:
+        entry = _cache.get(key)
+        if new_articles is None:
+            # Fetch failed: keep serving what we have (if anything) until the next TTL expiry
+            if entry is None:
+                return []
+            entry["fetched_at"] = time.time()
+            return list(entry["articles"])
+
+        merged = {}
+        for article in new_articles + (entry["articles"] if entry else []):
+            url = article.get('url')
+            if url and url not in merged:
+                merged[url] = article
+
+        articles = sorted(merged.values(), key=lambda a: a.get('publishedAt') or "", reverse=True)[:NEWS_MAX_ARTICLES]
+        _cache[key] = {"articles": articles, "fetched_at": time.time()}
+        return list(articles)
+
+
+def _news_params(stock_symbol, since=None):
     # Define the parameters for the NewsAPI request
     params = {
-        'q': stock_symbol,  # Query term (stock symbol or company name)
+        'q': news_search_term(stock_symbol),  # Query term (company name and symbol)
         'language': 'en',  # Language of the articles (English)
         'sortBy': 'publishedAt',  # Sort by publication date
-        'pageSize': 100,  # Limit to the top 10 articles
+        'pageSize': NEWS_MAX_ARTICLES,  # Limit to the top 100 articles
         'apiKey': NEWSAPI_KEY  # API Key for NewsAPI
     }
+    if since:
+        # Only articles published since the newest one already cached
+        params['from'] = since
+        _count("incremental_calls")
+    _count("api_calls")
+    return params
 
-    # Send the GET request to the NewsAPI
-    response = requests.get(NEWSAPI_URL, params=params)
 
+def _parse_articles(status_code, payload_fn):
     # Check if the request was successful
-    if response.status_code == 200:
+    if status_code == 200:
         # Parse the JSON response and return the articles
-        articles = response.json().get('articles', [])
-        return articles
-    else:
-        # Handle failed request and return an empty list
-        print(f"Error: Unable to fetch news. Status code {response.status_code}")
-        return []
+        return payload_fn().get('articles', [])
+
+    # Handle failed request, the caller falls back to cached articles
+    print(f"Error: Unable to fetch news. Status code {status_code}")
+    _count("errors")
+    return None
+
+
+# Function to fetch the latest news articles for a given stock symbol using requests
+def get_stock_news(stock_symbol):
+    """
+    Fetch the latest news articles related to a given stock symbol.
+
+    Results are cached per symbol for NEWS_CACHE_TTL seconds; after that only
+    articles newer than the newest cached one are requested and merged in.
+
+    Args:
+    - stock_symbol (str): The stock symbol or company name to search for in the news.
+
+    Returns:
+    - list: A list of news articles related to the stock symbol, newest first.
+    """
+    key = _cache_key(stock_symbol)
+    cached = _fresh_articles(key)
+    if cached is not None:
+        return cached
+
+    # Send the GET request to the NewsAPI over the pooled session
+    try:
+        response = _session.get(NEWSAPI_URL, params=_news_params(stock_symbol, _newest_published(key)), timeout=NEWSAPI_TIMEOUT)
+        articles = _parse_articles(response.status_code, response.json)
+    except requests.RequestException as e:
+        print(f"Error: Unable to fetch news. {e}")
+        _count("errors")
+        articles = None
+
+    return _merge_articles(key, articles)
+
+
+def get_async_client():
+    """
+    Return the shared pooled httpx.AsyncClient used for NewsAPI calls.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=NEWSAPI_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=NEWSAPI_MAX_CONNECTIONS,
+                max_keepalive_connections=NEWSAPI_MAX_CONNECTIONS
+            )
+        )
+    return _async_client
+
+
+async def close_async_client():
+    """
+    Close the shared async client (called on app shutdown).
+    """
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+async def aget_stock_news(stock_symbol, max_age=None):
+    """
+    Async variant of get_stock_news using the pooled httpx client and the same cache.
+
+    Args:
+    - stock_symbol (str): The stock symbol or company name to search for in the news.
+    - max_age (float, optional): Serve cached articles younger than this (default NEWS_CACHE_TTL, 0 forces a fetch).
+
+    Returns:
+    - list: A list of news articles related to the stock symbol, newest first.
+    """
+    key = _cache_key(stock_symbol)
+    cached = _fresh_articles(key, max_age)
+    if cached is not None:
+        return cached
+
+    try:
+        response = await get_async_client().get(NEWSAPI_URL, params=_news_params(stock_symbol, _newest_published(key)))
+        articles = _parse_articles(response.status_code, response.json)
+    except httpx.HTTPError as e:
+        print(f"Error: Unable to fetch news. {e}")
+        _count("errors")
+        articles = None
+
+    return _merge_articles(key, articles)
 
 
 # Example usage (Can be removed later)
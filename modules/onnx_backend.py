@@ -0,0 +1,255 @@
+import inspect
+import json
+import os
+import shutil
+import tempfile
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+# Exported + int8-quantized models, one directory per model (created on first use)
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx models")
+ONNX_NUM_THREADS = int(os.getenv("ONNX_NUM_THREADS", "0"))  # 0 = onnxruntime default
+ONNX_OPSET = 17
+
+QUANTIZED_FILE = "model.int8.onnx"
+ENCODER_CONFIG_FILE = "encoder.json"
+INPUT_NAMES = ["input_ids", "attention_mask", "token_type_ids"]
+
+# torch.onnx.export keeps global state, so exports within one process run one at a time
+_export_lock = threading.Lock()
+
+
+def _model_dir(model_name):
+    return os.path.join(ONNX_MODEL_DIR, model_name.replace("/", "__"))
+
+
+def _is_complete(directory, required):
+    return all(os.path.exists(os.path.join(directory, name)) for name in required)
+
+
+def _export_once(model_name, build, required):
+    """
+    Run `build(tmp_dir)` and move the finished export into place in one rename.
+
+    The model directory therefore only ever holds a complete export: a crash
+    leaves just a temp directory behind, and when several workers export at
+    once the first rename wins and the others discard their copy.
+    """
+    directory = _model_dir(model_name)
+    if _is_complete(directory, required):
+        return directory
+
+    with _export_lock:
+        # Another thread may have finished the export while we waited
+        if _is_complete(directory, required):
+            return directory
+        _build_into(directory, model_name, build, required)
+    return directory
+
+
+def _build_into(directory, model_name, build, required):
+    if os.path.isdir(directory) and not _is_complete(directory, required):
+        # Left incomplete by an older, non-atomic export
+        shutil.rmtree(directory, ignore_errors=True)
+
+    os.makedirs(ONNX_MODEL_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".export-", dir=ONNX_MODEL_DIR)
+    try:
+        print(f"Exporting {model_name} to ONNX (int8) in {directory}")
+        build(tmp_dir)
+        try:
+            os.replace(tmp_dir, directory)
+        except OSError:
+            # Another worker finished first
+            if not _is_complete(directory, required):
+                raise
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def _export(module, tokenizer, directory, output_name):
+    """
+    Export a (input_ids, attention_mask, token_type_ids) -> tensor module to ONNX
+    with dynamic batch/sequence axes, then quantize its weights to int8.
+    """
+    import torch
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    fp32_path = os.path.join(directory, "model.onnx")
+    sample = tokenizer(["export sample", "a slightly longer export sample"], padding=True, return_tensors="pt")
+    if "token_type_ids" not in sample:
+        sample["token_type_ids"] = torch.zeros_like(sample["input_ids"])
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in INPUT_NAMES}
+    dynamic_axes[output_name] = {0: "batch"}
+    # Newer torch defaults to the dynamo exporter; keep the TorchScript one where the flag exists
+    options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.inference_mode():
+        torch.onnx.export(
+            module.eval(),
+            tuple(sample[name] for name in INPUT_NAMES),
+            fp32_path,
+            input_names=INPUT_NAMES,
+            output_names=[output_name],
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET,
+            **options
+        )
+
+    quantize_dynamic(fp32_path, os.path.join(directory, QUANTIZED_FILE), weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    tokenizer.save_pretrained(directory)
+
+
+def export_sequence_classifier(model_name):
+    """
+    Export a Hugging Face sequence classifier (FinBERT) to int8 ONNX, returning its directory.
+    """
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    class Logits(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids).logits
+
+    def build(directory):
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        _export(Logits(model), AutoTokenizer.from_pretrained(model_name), directory, "logits")
+
+    return _export_once(model_name, build, [QUANTIZED_FILE, "tokenizer_config.json"])
+
+
+def export_sentence_encoder(model_name):
+    """
+    Export a SentenceTransformer's transformer (MiniLM) to int8 ONNX, returning its directory.
+
+    Pooling and normalisation are plain numpy in OnnxSentenceEncoder, so only
+    the transformer is exported; their settings go to encoder.json.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    class Hidden(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            ).last_hidden_state
+
+    def build(directory):
+        encoder = SentenceTransformer(model_name, device="cpu")
+        _export(Hidden(encoder[0].auto_model), encoder.tokenizer, directory, "last_hidden_state")
+
+        with open(os.path.join(directory, ENCODER_CONFIG_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "max_seq_length": encoder.max_seq_length,
+                "normalize": any(type(module).__name__ == "Normalize" for module in encoder)
+            }, f)
+
+    return _export_once(model_name, build, [QUANTIZED_FILE, "tokenizer_config.json", ENCODER_CONFIG_FILE])
+
+
+def _session(directory):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if ONNX_NUM_THREADS > 0:
+        options.intra_op_num_threads = ONNX_NUM_THREADS
+    return ort.InferenceSession(
+        os.path.join(directory, QUANTIZED_FILE), options, providers=["CPUExecutionProvider"]
+    )
+
+
+def _feeds(encoded):
+    feeds = {name: np.asarray(encoded[name], dtype=np.int64) for name in INPUT_NAMES if name in encoded}
+    feeds.setdefault("token_type_ids", np.zeros_like(feeds["input_ids"]))
+    return feeds
+
+
+class OnnxSequenceClassifier:
+    """
+    ONNX Runtime stand-in for the FinBERT torch model: `model(**batch).logits`.
+    """
+
+    def __init__(self, directory):
+        self.session = _session(directory)
+        self.model_bytes = os.path.getsize(os.path.join(directory, QUANTIZED_FILE))
+
+    def __call__(self, **batch):
+        import torch
+
+        encoded = {name: tensor.numpy() if hasattr(tensor, "numpy") else tensor for name, tensor in batch.items()}
+        logits = self.session.run(["logits"], _feeds(encoded))[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+
+class OnnxSentenceEncoder:
+    """
+    ONNX Runtime stand-in for SentenceTransformer.encode (mean pooling, optional L2 normalisation).
+    """
+
+    def __init__(self, directory):
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(directory, ENCODER_CONFIG_FILE), encoding="utf-8") as f:
+            config = json.load(f)
+        self.max_seq_length = config["max_seq_length"]
+        self.normalize = config["normalize"]
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        self.session = _session(directory)
+        self.model_bytes = os.path.getsize(os.path.join(directory, QUANTIZED_FILE))
+
+    def _encode_batch(self, texts):
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        hidden = self.session.run(["last_hidden_state"], _feeds(encoded))[0]
+        mask = encoded["attention_mask"][..., None].astype(hidden.dtype)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Longest first, like SentenceTransformer, so each batch pads to similar lengths
+        order = sorted(range(len(texts)), key=lambda i: -len(texts[i]))
+        embeddings = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch_ids = order[start:start + batch_size]
+            for i, vector in zip(batch_ids, self._encode_batch([texts[i] for i in batch_ids])):
+                embeddings[i] = vector
+
+        embeddings = np.stack(embeddings)
+        return embeddings[0] if single else embeddings
+
+
+def load_sequence_classifier(model_name):
+    """
+    Return (tokenizer, OnnxSequenceClassifier) for a model, exporting it on first use.
+    """
+    from transformers import AutoTokenizer
+
+    directory = export_sequence_classifier(model_name)
+    return AutoTokenizer.from_pretrained(directory), OnnxSequenceClassifier(directory)
+
+
+def load_sentence_encoder(model_name):
+    """
+    Return an OnnxSentenceEncoder for a SentenceTransformer model, exporting it on first use.
+    """
+    return OnnxSentenceEncoder(export_sentence_encoder(model_name))
@@ -0,0 +1,183 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.price_store import get_histories, recent_bars
+from modules.stock_data import normalize_symbol
+
+# Calendar days of daily closes behind returns, volatility and correlations
+PORTFOLIO_LOOKBACK_DAYS = int(os.getenv("PORTFOLIO_LOOKBACK_DAYS", "60"))
+# Most correlated holding pairs passed to the LLM
+TOP_CORRELATED_PAIRS = 3
+TRADING_DAYS = 252
+
+
+def closes_frame(histories, days=PORTFOLIO_LOOKBACK_DAYS):
+    """
+    Align the closing prices of several histories on trading date (one column per ticker).
+    """
+    closes = {}
+    for symbol, hist in histories.items():
+        bars = recent_bars(hist, days)
+        if bars.empty:
+            continue
+        close = bars["Close"]
+        # NSE and BSE bars share a timezone; compare on the local trading date
+        index = close.index.tz_localize(None) if close.index.tz is not None else close.index
+        closes[symbol] = pd.Series(close.to_numpy(), index=index.normalize())
+
+    if not closes:
+        return pd.DataFrame()
+    frame = pd.DataFrame(closes).sort_index()
+    frame = frame[~frame.index.duplicated(keep="last")]
+    return frame.ffill()
+
+
+def analyze_holdings(holdings, sectors=None, days=PORTFOLIO_LOOKBACK_DAYS):
+    """
+    Value, weights, returns, risk and concentration of a portfolio from one batched price download.
+
+    Prices come from get_histories, which refreshes every stale ticker with a
+    single multi-ticker yfinance download. All figures are computed column-wise
+    over the aligned close matrix:
+
+    - value and weight of each holding at the last close, sector weights by value
+    - period return and annualised volatility per holding and for the portfolio
+      (current quantities held over the window), plus its max drawdown
+    - the correlation matrix of daily returns, its average pairwise value and
+      the most correlated pairs
+    - Herfindahl-Hirschman index of holding and sector weights, effective number of holdings
+
+    Args:
+        holdings (list[tuple[str, float]]): (symbol, quantity) pairs; repeated symbols are summed.
+        sectors (dict[str, str], optional): Sector per input symbol.
+        days (int): Calendar days of history used for returns and risk.
+
+    Returns:
+        dict: JSON-ready analytics; tickers without prices are listed under 'missing'.
+    """
+    sectors = sectors or {}
+    quantities, ticker_sectors = {}, {}
+    for symbol, quantity in holdings:
+        ticker = normalize_symbol(symbol)
+        quantities[ticker] = quantities.get(ticker, 0) + quantity
+        ticker_sectors.setdefault(ticker, sectors.get(symbol, "Unknown"))
+
+    closes = closes_frame(get_histories(list(quantities)), days)
+    priced = [ticker for ticker in quantities if ticker in closes.columns and closes[ticker].notna().any()]
+    missing = [ticker for ticker in quantities if ticker not in priced]
+    unpriced = {"total_value": 0.0, "holdings": [], "missing": missing}
+    if not priced:
+        return unpriced
+
+    closes = closes[priced]
+    qty = np.array([quantities[ticker] for ticker in priced], dtype=float)
+    prices = closes.iloc[-1].to_numpy()
+    values = qty * prices
+    total = values.sum()
+    # Weights are undefined without a positive total (e.g. quantities netting to zero)
+    if not np.isfinite(total) or total <= 0:
+        return unpriced
+    weights = values / total
+
+    # Per holding: first available close -> last close
+    first = closes.bfill().iloc[0].to_numpy()
+    period_returns = prices / first - 1
+    returns = closes.pct_change(fill_method=None).iloc[1:]
+    volatility = returns.std().to_numpy() * np.sqrt(TRADING_DAYS)
+
+    # Portfolio: today's quantities held over the whole window
+    portfolio_value = closes.bfill().to_numpy() @ qty
+    portfolio_returns = np.diff(portfolio_value) / portfolio_value[:-1]
+    drawdown = portfolio_value / np.maximum.accumulate(portfolio_value) - 1
+
+    sector_of = np.array([ticker_sectors[ticker] for ticker in priced])
+    sector_weights = pd.Series(weights).groupby(sector_of).sum().sort_values(ascending=False)
+
+    corr = returns.corr(min_periods=5)
+    upper = np.triu_indices(len(priced), 1)
+    pair_corr = corr.to_numpy()[upper]
+    pairs = [
+        [priced[upper[0][k]], priced[upper[1][k]], round(float(pair_corr[k]), 3)]
+        for k in np.argsort(-np.nan_to_num(pair_corr, nan=-np.inf))[:TOP_CORRELATED_PAIRS]
+        if not np.isnan(pair_corr[k])
+    ]
+
+    hhi = float(np.sum(weights ** 2))
+    portfolio_volatility = float(np.std(portfolio_returns, ddof=1) * np.sqrt(TRADING_DAYS)) if len(portfolio_returns) > 1 else None
+
+    return {
+        "as_of": closes.index[-1].strftime("%Y-%m-%d"),
+        "days": len(closes),
+        "total_value": round(float(total), 2),
+        "holdings": [
+            {
+                "symbol": ticker,
+                "sector": ticker_sectors[ticker],
+                "quantity": quantities[ticker],
+                "price": round(float(prices[i]), 2),
+                "value": round(float(values[i]), 2),
+                "weight": round(float(weights[i]), 4),
+                "return": round(float(period_returns[i]), 4),
+                "volatility": None if np.isnan(volatility[i]) else round(float(volatility[i]), 4)
+            }
+            for i, ticker in enumerate(priced)
+        ],
+        "sector_weights": {sector: round(float(weight), 4) for sector, weight in sector_weights.items()},
+        "portfolio": {
+            "return": round(float(portfolio_value[-1] / portfolio_value[0] - 1), 4),
+            "volatility": None if portfolio_volatility is None else round(portfolio_volatility, 4),
+            "max_drawdown": round(float(drawdown.min()), 4)
+        },
+        "concentration": {
+            "hhi": round(hhi, 4),
+            "effective_holdings": round(1 / hhi, 2),
+            "top_weight": round(float(weights.max()), 4),
+            "sector_hhi": round(float(np.sum(sector_weights.to_numpy() ** 2)), 4)
+        },
+        "correlation": {
+            "average": None if np.all(np.isnan(pair_corr)) else round(float(np.nanmean(pair_corr)), 3),
+            "top_pairs": pairs,
+            "matrix": corr.round(3).astype(object).where(corr.notna(), None).to_dict()
+        },
+        "missing": missing
+    }
+
+
+def _pct(value):
+    return "n/a" if value is None else f"{value * 100:.1f}%"
+
+
+def analytics_summary(analytics):
+    """
+    Compact plain-text digest of analyze_holdings output for the LLM prompt (no raw prices).
+    """
+    if not analytics.get("holdings"):
+        missing = ", ".join(analytics.get("missing", [])) or "none"
+        return f"No price data available (missing: {missing})."
+
+    lines = [f"Value {analytics['total_value']:,.0f} INR as of {analytics['as_of']} ({analytics['days']} trading days)."]
+    lines.append("Holdings (weight, return, ann. volatility): " + "; ".join(
+        f"{h['symbol']} [{h['sector']}] {_pct(h['weight'])}, {_pct(h['return'])}, {_pct(h['volatility'])}"
+        for h in sorted(analytics["holdings"], key=lambda h: -h["weight"])
+    ))
+    lines.append("Sectors by value: " + ", ".join(
+        f"{sector} {_pct(weight)}" for sector, weight in analytics["sector_weights"].items()
+    ))
+    portfolio, concentration = analytics["portfolio"], analytics["concentration"]
+    lines.append(
+        f"Portfolio return {_pct(portfolio['return'])}, ann. volatility {_pct(portfolio['volatility'])}, "
+        f"max drawdown {_pct(portfolio['max_drawdown'])}."
+    )
+    lines.append(
+        f"Concentration: HHI {concentration['hhi']:.2f} (~{concentration['effective_holdings']} effective holdings), "
+        f"top holding {_pct(concentration['top_weight'])}, sector HHI {concentration['sector_hhi']:.2f}."
+    )
+    correlation = analytics["correlation"]
+    if correlation["average"] is not None:
+        pairs = ", ".join(f"{a}/{b} {c:.2f}" for a, b, c in correlation["top_pairs"])
+        lines.append(f"Average pairwise correlation {correlation['average']:.2f}; most correlated: {pairs}.")
+    if analytics["missing"]:
+        lines.append("No price data: " + ", ".join(analytics["missing"]) + ".")
+    return "\n".join(lines)
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import time
+
+from modules.price_store import get_histories
+from modules.stock_data import normalize_symbol
+from modules.news_fetcher import aget_stock_news, NEWS_MAX_ARTICLES
+from modules.embedding import embed_and_store_batch
+from modules.sentiment_analyser1 import analyze_sentiment, reserve_score_cache
+from modules.executors import run_blocking, run_inference, PeriodicTask
+
+# Comma-separated symbols refreshed in the background, e.g. "TCS,INFY,RELIANCE" (empty disables it)
+PREWARM_SYMBOLS = [s.strip() for s in os.getenv("PREWARM_SYMBOLS", "").split(",") if s.strip()]
+# Kept below PRICE_REFRESH_SECONDS / NEWS_CACHE_TTL so queries for these symbols never fetch
+PREWARM_INTERVAL = float(os.getenv("PREWARM_INTERVAL", "240"))
+# Each wait is randomised by +/- this fraction so workers don't hit the APIs in lockstep
+PREWARM_JITTER = float(os.getenv("PREWARM_JITTER", "0.1"))
+# NewsAPI calls in flight at once during a refresh
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "4"))
+PREWARM_SENTIMENT_BATCH_SIZE = int(os.getenv("PREWARM_SENTIMENT_BATCH_SIZE", "64"))
+
+STAGES = ["prices", "news", "embeddings", "sentiment"]
+
+_symbols = []
+_refreshed = {}  # ticker -> {stage: epoch seconds of its last successful refresh}
+
+
+def _mark(tickers, stage):
+    now = time.time()
+    for ticker in tickers:
+        _refreshed.setdefault(ticker, {})[stage] = now
+
+
+async def refresh(symbols):
+    """
+    Refresh prices, news, stored embeddings and sentiment scores for the given symbols.
+
+    Uses the same caches the query path reads (price store, news cache, vector
+    store, sentiment score cache), refreshing them regardless of their age.
+    """
+    tickers = list(dict.fromkeys(normalize_symbol(symbol) for symbol in symbols))
+
+    await run_blocking(get_histories, tickers, max_age=0)
+    _mark(tickers, "prices")
+
+    semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+    async def fetch(ticker):
+        async with semaphore:
+            # Same cache key as the query path, which looks news up by the bare symbol
+            return await aget_stock_news(ticker.split(".")[0], max_age=0)
+
+    articles = dict(zip(tickers, await asyncio.gather(*(fetch(ticker) for ticker in tickers))))
+    _mark(tickers, "news")
+
+    await run_inference(embed_and_store_batch, articles)
+    _mark(tickers, "embeddings")
+
+    pool = [article for news in articles.values() for article in news if article.get("content")]
+    await run_inference(analyze_sentiment, pool, PREWARM_SENTIMENT_BATCH_SIZE)
+    _mark(tickers, "sentiment")
+
+
+async def _refresh_job():
+    await refresh(_symbols)
+
+
+_job = PeriodicTask("Prewarm refresh", _refresh_job, PREWARM_INTERVAL, PREWARM_JITTER)
+
+
+def start(symbols=None):
+    """
+    Start the background refresh loop on the running event loop (no-op without symbols).
+    """
+    global _symbols
+    symbols = symbols if symbols is not None else PREWARM_SYMBOLS
+    if not symbols:
+        return None
+    if not _job.running:
+        _symbols = list(symbols)
+        # Each cycle scores up to NEWS_MAX_ARTICLES per symbol; a smaller LRU would evict them all every time
+        reserve_score_cache(len(_symbols) * NEWS_MAX_ARTICLES)
+        print(f"Prewarming {len(symbols)} symbols every ~{PREWARM_INTERVAL:.0f}s")
+    return _job.start()
+
+
+async def stop():
+    await _job.stop()
+
+
+def status():
+    """
+    Staleness report: seconds since each stage was last refreshed, per ticker.
+
+    A ticker is flagged stale when any stage is older than twice the interval
+    (i.e. at least one refresh was missed) or has never completed.
+    """
+    now = time.time()
+    symbols = {}
+    for ticker in dict.fromkeys(normalize_symbol(symbol) for symbol in _symbols):
+        refreshed = _refreshed.get(ticker, {})
+        ages = {stage: round(now - refreshed[stage], 1) if stage in refreshed else None for stage in STAGES}
+        symbols[ticker] = {
+            "age_seconds": ages,
+            "stale": any(age is None or age > 2 * PREWARM_INTERVAL for age in ages.values())
+        }
+
+    return {
+        "running": _job.running,
+        "interval_seconds": PREWARM_INTERVAL,
+        "cycles": dict(_job.stats),
+        "symbols": symbols
+    }
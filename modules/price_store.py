@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+import yfinance as yf
+
+# One parquet file of daily OHLCV bars per symbol
+PRICE_STORE_DIR = os.getenv("PRICE_STORE_DIR", "price store")
+# History pulled the first time a symbol is seen (covers the 30-close chart)
+INITIAL_PERIOD = os.getenv("PRICE_INITIAL_PERIOD", "60d")
+# How long a symbol's bars are served from memory before checking for newer ones
+PRICE_REFRESH_SECONDS = int(os.getenv("PRICE_REFRESH_SECONDS", "300"))
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+_frames = {}  # symbol -> (DataFrame, last refresh time)
+_locks = defaultdict(threading.Lock)
+
+
+def _path(symbol):
+    return os.path.join(PRICE_STORE_DIR, f"{symbol}.parquet")
+
+
+def _load(symbol):
+    path = _path(symbol)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"Error reading price store for {symbol}: {e}")
+        return None
+
+
+def _save(symbol, hist):
+    os.makedirs(PRICE_STORE_DIR, exist_ok=True)
+    tmp_path = _path(symbol) + ".tmp"
+    hist.to_parquet(tmp_path)
+    os.replace(tmp_path, _path(symbol))
+
+
+def _fetch(symbol, stored):
+    """
+    Fetch the full initial history, or only the bars from the last stored date onwards.
+    """
+    ticker = yf.Ticker(symbol)
+    if stored is None or stored.empty:
+        return ticker.history(period=INITIAL_PERIOD)
+
+    # Re-fetch the last stored day too, its bar may have been captured mid-session
+    return ticker.history(start=stored.index[-1].strftime("%Y-%m-%d"))
+
+
+def merge_bars(stored, fetched):
+    """
+    Append fetched bars to the stored history, newer rows replacing overlapping dates.
+    """
+    missing = [col for col in PRICE_COLUMNS if col not in fetched.columns]
+    if fetched.empty or missing:
+        return stored if stored is not None else pd.DataFrame(columns=PRICE_COLUMNS)
+
+    fetched = fetched[PRICE_COLUMNS]
+    if stored is None or stored.empty:
+        return fetched.sort_index()
+
+    if fetched.index.tz != stored.index.tz:
+        if fetched.index.tz is None:
+            fetched = fetched.tz_localize(stored.index.tz)
+        else:
+            fetched = fetched.tz_convert(stored.index.tz)
+    merged = pd.concat([stored, fetched])
+    return merged[~merged.index.duplicated(keep="last")].sort_index()
+
+
+def get_history(symbol):
+    """
+    Return the daily OHLCV history for a ticker from the local store.
+
+    The first call for a symbol fetches INITIAL_PERIOD of bars; later calls
+    (at most once every PRICE_REFRESH_SECONDS) only fetch bars newer than the
+    last stored date and append them to the symbol's parquet file.
+
+    Args:
+        symbol (str): yfinance ticker, e.g. "TCS.NS" (see stock_data.normalize_symbol).
+
+    Returns:
+        pd.DataFrame: OHLCV bars indexed by date, empty if nothing is available.
+    """
+    with _locks[symbol]:
+        cached = _frames.get(symbol)
+        if cached is not None and time.time() - cached[1] < PRICE_REFRESH_SECONDS:
+            return cached[0]
+
+        stored = cached[0] if cached is not None else _load(symbol)
+
+        try:
+            fetched = _fetch(symbol, stored)
+        except Exception as e:
+            print(f"Error fetching price history for {symbol}: {e}")
+            fetched = pd.DataFrame()
+
+        hist = merge_bars(stored, fetched)
+        if not fetched.empty and not hist.empty:
+            _save(symbol, hist)
+
+        _frames[symbol] = (hist, time.time())
+        return hist
+
+
+def _download(stale):
+    """
+    One multi-ticker download covering every stale symbol: the initial period if any
+    symbol has no stored bars yet, otherwise from the oldest last-stored date.
+    """
+    starts = [stored.index[-1] for stored in stale.values() if stored is not None and not stored.empty]
+    if len(starts) < len(stale):
+        window = {"period": INITIAL_PERIOD}
+    else:
+        window = {"start": min(starts).strftime("%Y-%m-%d")}
+    return yf.download(list(stale), group_by="ticker", ignore_tz=False, progress=False, threads=True, **window)
+
+
+def _split_download(frame, symbols):
+    """
+    Per-symbol OHLCV frames from a `yf.download(group_by="ticker")` result.
+    """
+    bars = {}
+    for symbol in symbols:
+        if isinstance(frame.columns, pd.MultiIndex):
+            if symbol not in frame.columns.get_level_values(0):
+                continue
+            bars[symbol] = frame[symbol].dropna(how="all")
+        else:
+            bars[symbol] = frame.dropna(how="all")
+    return bars
+
+
+def get_histories(symbols, max_age=None):
+    """
+    Return daily OHLCV histories for many tickers at once.
+
+    Symbols still fresh in memory are served as they are; all the others are
+    refreshed with a single multi-ticker `yf.download` instead of one
+    `Ticker.history` call each, then merged and saved like get_history.
+
+    Args:
+        symbols (list[str]): yfinance tickers, e.g. ["TCS.NS", "INFY.NS"].
+        max_age (float, optional): Refresh symbols refreshed longer ago than this
+            (default PRICE_REFRESH_SECONDS; 0 refreshes all of them).
+
+    Returns:
+        dict[str, pd.DataFrame]: Bars per ticker, empty frames where nothing is available.
+    """
+    max_age = PRICE_REFRESH_SECONDS if max_age is None else max_age
+    histories, stale = {}, {}
+    for symbol in dict.fromkeys(symbols):
+        cached = _frames.get(symbol)
+        if cached is not None and time.time() - cached[1] < max_age:
+            histories[symbol] = cached[0]
+        else:
+            stale[symbol] = cached[0] if cached is not None else _load(symbol)
+
+    if not stale:
+        return histories
+
+    try:
+        fetched = _split_download(_download(stale), list(stale))
+    except Exception as e:
+        print(f"Error downloading price history for {len(stale)} symbols: {e}")
+        fetched = {}
+
+    for symbol, stored in stale.items():
+        with _locks[symbol]:
+            bars = fetched.get(symbol, pd.DataFrame())
+            hist = merge_bars(stored, bars)
+            if not bars.empty and not hist.empty:
+                _save(symbol, hist)
+            _frames[symbol] = (hist, time.time())
+            histories[symbol] = hist
+
+    return histories
+
+
+def recent_bars(hist, days=7):
+    """
+    Keep the bars from the last `days` calendar days of a history.
+    """
+    if hist.empty:
+        return hist
+    cutoff = pd.Timestamp.now(tz=hist.index.tz) - pd.Timedelta(days=days)
+    return hist[hist.index >= cutoff]
+
+
+def get_recent_bars(symbol, days=7):
+    """
+    Return the bars from the last `days` calendar days (the old `period="7d"` window).
+    """
+    return recent_bars(get_history(symbol), days)
+
+
+def get_closes(symbol, count=30):
+    """
+    Return the last `count` closing prices for the chart series.
+    """
+    return get_history(symbol).tail(count)["Close"]
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+from modules.tracing import record_llm_call
+
+# Default budget shared by every client of a provider; override per provider with
+# e.g. LLM_OPENROUTER_REQUESTS_PER_MIN / LLM_GEMINI_TOKENS_PER_MIN
+LLM_REQUESTS_PER_MIN = float(os.getenv("LLM_REQUESTS_PER_MIN", "30"))
+LLM_TOKENS_PER_MIN = float(os.getenv("LLM_TOKENS_PER_MIN", "100000"))
+# Completion tokens reserved per call on top of the prompt estimate
+LLM_COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", "400"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "2"))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate_per_min`.
+
+    `reserve` always succeeds and may push the level below zero; the caller
+    then sleeps for the returned time, which keeps waiting outside the lock
+    and works the same for threads and coroutines.
+    """
+
+    def __init__(self, rate_per_min, capacity=None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity or rate_per_min
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        with self.lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            self.level -= min(amount, self.capacity)
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget for one LLM provider.
+    """
+
+    def __init__(self, requests_per_min, tokens_per_min):
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min)
+        self.stats = {"calls": 0, "throttled_seconds": 0.0, "retries": 0}
+
+    def reserve(self, tokens):
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        self.stats["calls"] += 1
+        self.stats["throttled_seconds"] += wait
+        return wait
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider):
+    """
+    Return the process-wide limiter for a provider ("openrouter", "gemini", ...).
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            prefix = f"LLM_{provider.upper()}_"
+            _limiters[provider] = RateLimiter(
+                float(os.getenv(prefix + "REQUESTS_PER_MIN", LLM_REQUESTS_PER_MIN)),
+                float(os.getenv(prefix + "TOKENS_PER_MIN", LLM_TOKENS_PER_MIN))
+            )
+        return _limiters[provider]
+
+
+def prompt_text(prompt):
+    """
+    Text of a prompt given as a string or a list of messages.
+    """
+    if isinstance(prompt, str):
+        return prompt
+    return " ".join(str(getattr(message, "content", message)) for message in prompt)
+
+
+def estimate_tokens(prompt):
+    """
+    Rough token count of a prompt (string or list of messages), ~4 characters per token.
+    """
+    return len(prompt_text(prompt)) // 4 + 1
+
+
+def is_rate_limit_error(error):
+    """
+    True for HTTP 429 / quota errors raised by the OpenAI or Google clients.
+    """
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    name = type(error).__name__
+    message = str(error)
+    return "RateLimit" in name or "ResourceExhausted" in name or "429" in message or "RESOURCE_EXHAUSTED" in message
+
+
+def _backoff(attempt):
+    return LLM_BACKOFF_SECONDS * (2 ** attempt) * (0.5 + random.random())
+
+
+class RateLimitedLLM:
+    """
+    Wraps a LangChain chat model so every invoke/ainvoke draws from the provider's
+    shared budget and 429s are retried with exponential backoff.
+    """
+
+    def __init__(self, llm, provider):
+        self.llm = llm
+        self.provider = provider
+        self.limiter = get_limiter(provider)
+
+    def _record(self, prompt, prompt_tokens, started):
+        record_llm_call(self.provider, len(prompt_text(prompt)), prompt_tokens, time.perf_counter() - started)
+
+    def invoke(self, prompt, *args, **kwargs):
+        prompt_tokens = estimate_tokens(prompt)
+        tokens = prompt_tokens + LLM_COMPLETION_TOKENS
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            time.sleep(self.limiter.reserve(tokens))
+            started = time.perf_counter()
+            try:
+                response = self.llm.invoke(prompt, *args, **kwargs)
+                self._record(prompt, prompt_tokens, started)
+                return response
+            except Exception as e:
+                if attempt == LLM_MAX_RETRIES or not is_rate_limit_error(e):
+                    raise
+                self.limiter.stats["retries"] += 1
+                time.sleep(_backoff(attempt))
+
+    async def ainvoke(self, prompt, *args, **kwargs):
+        prompt_tokens = estimate_tokens(prompt)
+        tokens = prompt_tokens + LLM_COMPLETION_TOKENS
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await asyncio.sleep(self.limiter.reserve(tokens))
+            started = time.perf_counter()
+            try:
+                response = await self.llm.ainvoke(prompt, *args, **kwargs)
+                self._record(prompt, prompt_tokens, started)
+                return response
+            except Exception as e:
+                if attempt == LLM_MAX_RETRIES or not is_rate_limit_error(e):
+                    raise
+                self.limiter.stats["retries"] += 1
+                await asyncio.sleep(_backoff(attempt))
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+def rate_limited(llm, provider):
+    """
+    Wrap a chat model in the shared rate limiter for its provider.
+    """
+    return RateLimitedLLM(llm, provider)
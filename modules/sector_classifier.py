@@ -0,0 +1,151 @@
+import json
+import os
+import re
+import threading
+
+from modules.stock_data import normalize_symbol
+from modules.ticker_resolver import bundled_sector
+from modules.llm_cache import parse_json_response
+
+# Persistent symbol -> sector cache, on top of the sectors bundled with the NSE symbol list
+SECTOR_CACHE_PATH = os.getenv("SECTOR_CACHE_PATH", "sector_cache.json")
+
+SECTORS = [
+    "IT", "Banking", "Financial Services", "Insurance", "Energy", "Power", "FMCG", "Pharma",
+    "Healthcare", "Auto", "Metals", "Cement", "Telecom", "Infrastructure", "Capital Goods",
+    "Consumer Durables", "Chemicals", "Realty", "Retail", "Services", "Textiles"
+]
+
+# Free-form LLM labels mapped onto the canonical sectors above
+SECTOR_SYNONYMS = {
+    "information technology": "IT", "it services": "IT", "software": "IT", "technology": "IT", "tech": "IT",
+    "bank": "Banking", "banks": "Banking", "private bank": "Banking", "psu bank": "Banking",
+    "public sector bank": "Banking", "financial": "Financial Services", "financials": "Financial Services",
+    "finance": "Financial Services", "nbfc": "Financial Services", "fintech": "Financial Services",
+    "oil & gas": "Energy", "oil and gas": "Energy", "petroleum": "Energy", "gas": "Energy",
+    "utilities": "Power", "electricity": "Power", "renewable energy": "Power", "power generation": "Power",
+    "consumer goods": "FMCG", "consumer staples": "FMCG", "fast moving consumer goods": "FMCG",
+    "pharmaceuticals": "Pharma", "pharmaceutical": "Pharma", "hospitals": "Healthcare",
+    "automobile": "Auto", "automobiles": "Auto", "automotive": "Auto", "auto ancillary": "Auto",
+    "metal": "Metals", "steel": "Metals", "mining": "Metals", "metals & mining": "Metals",
+    "telecommunication": "Telecom", "telecommunications": "Telecom",
+    "construction": "Infrastructure", "engineering": "Infrastructure", "industrials": "Capital Goods",
+    "defence": "Capital Goods", "defense": "Capital Goods",
+    "real estate": "Realty", "consumer discretionary": "Consumer Durables", "insurance services": "Insurance",
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def normalize_sector(label):
+    """
+    Map a free-form sector label onto one canonical name ("Information Technology" -> "IT").
+    """
+    cleaned = re.sub(r"\bsector\b", "", (label or "").strip().strip(".\"'*`").lower()).strip(" -:")
+    if not cleaned:
+        return "Unknown"
+    for sector in SECTORS:
+        if cleaned == sector.lower():
+            return sector
+    return SECTOR_SYNONYMS.get(cleaned, cleaned.title())
+
+
+def _base_symbol(symbol):
+    return normalize_symbol(symbol).rsplit(".", 1)[0]
+
+
+def _load_cache():
+    global _cache
+    if _cache is None:
+        try:
+            with open(SECTOR_CACHE_PATH, encoding="utf-8") as f:
+                _cache = json.load(f)
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def _save_cache():
+    tmp_path = SECTOR_CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, SECTOR_CACHE_PATH)
+
+
+def cached_sectors(symbols):
+    """
+    Look symbols up in the bundled map and the persistent cache.
+
+    Returns:
+        tuple[dict, list]: ({symbol: sector} for hits, [symbols that missed])
+    """
+    hits, misses = {}, []
+    with _cache_lock:
+        cache = _load_cache()
+        for symbol in symbols:
+            base = _base_symbol(symbol)
+            sector = bundled_sector(base) or cache.get(base)
+            if sector:
+                hits[symbol] = sector
+            elif symbol not in misses:
+                misses.append(symbol)
+    return hits, misses
+
+
+def batch_prompt(symbols):
+    return f"""
+    Identify the SECTOR ONLY STRICTLY for each of these Indian stock symbols: {", ".join(symbols)}.
+    Use one of: {", ".join(SECTORS)}.
+    If unknown, guess based on the company name.
+    Return ONLY a JSON object mapping each symbol exactly as given to its sector, with no other text.
+    """
+
+
+def parse_batch_response(symbols, content):
+    """
+    Parse the batched LLM answer and store every classified symbol in the cache.
+
+    Returns:
+        dict: {symbol: normalized sector}, "Unknown" for symbols the answer did not cover.
+    """
+    answer = parse_json_response(content, "sector classification")
+    sectors = {}
+    with _cache_lock:
+        cache = _load_cache()
+        for symbol in symbols:
+            label = answer.get(symbol.strip().upper())
+            if not label:
+                sectors[symbol] = "Unknown"
+                continue
+            sectors[symbol] = normalize_sector(str(label))
+            cache[_base_symbol(symbol)] = sectors[symbol]
+        _save_cache()
+    return sectors
+
+
+def classify_sectors(symbols, llm):
+    """
+    Return the sector of every symbol, asking the LLM once for all cache misses.
+
+    Args:
+        symbols (list[str]): Portfolio symbols as entered by the user.
+        llm: LangChain chat model used for symbols missing from the cache.
+
+    Returns:
+        dict: {symbol: sector}
+    """
+    sectors, misses = cached_sectors(symbols)
+    if misses:
+        sectors.update(parse_batch_response(misses, llm.invoke(batch_prompt(misses)).content))
+    return sectors
+
+
+async def aclassify_sectors(symbols, llm):
+    """
+    Async variant of classify_sectors using `llm.ainvoke`.
+    """
+    sectors, misses = cached_sectors(symbols)
+    if misses:
+        sectors.update(parse_batch_response(misses, (await llm.ainvoke(batch_prompt(misses))).content))
+    return sectors
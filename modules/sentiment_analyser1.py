@@ -1,53 +1,194 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import torch
 import torch.nn.functional as F
 
+import hashlib
 import os
-os.environ["HF_HUB_DISABLE_SYMLINKS_WARNING"] = "1"
+import threading
+from collections import OrderedDict
 
-# Load FinBERT model + tokenizer
-MODEL_NAME = "yiyanghkust/finbert-tone"
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+from modules.model_registry import get_sentiment_model, SENTIMENT_MODEL_NAME
+from modules.micro_batcher import MicroBatcher, MICRO_BATCH_ENABLED
+
+# FinBERT model + tokenizer are loaded lazily through the shared registry
+MODEL_NAME = SENTIMENT_MODEL_NAME
 
 # Labels used by FinBERT
 LABELS = ["positive", "negative", "neutral"]
 
+# Batched inference settings (CPU-only nodes)
+MAX_LENGTH = 512
+MAX_BATCH_SIZE = int(os.getenv("SENTIMENT_MAX_BATCH_SIZE", "16"))
+NUM_THREADS = int(os.getenv("SENTIMENT_NUM_THREADS", "0"))  # 0 = leave torch default
+
+if NUM_THREADS > 0:
+    torch.set_num_threads(NUM_THREADS)
+
+# Scores of already analysed articles, keyed by URL + content hash (filled by queries and the prewarmer)
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "4096"))
+_score_cache = OrderedDict()
+_score_cache_lock = threading.Lock()
+_score_cache_size = SENTIMENT_CACHE_SIZE
+sentiment_stats = {"cache_hits": 0, "scored": 0}
+
+
+def _score_key(article):
+    return article.get("url"), hashlib.sha1(article["content"].encode("utf-8")).hexdigest()
+
+
+def reserve_score_cache(entries):
+    """
+    Grow the score cache to hold at least `entries` articles (e.g. the prewarmed working set).
+    """
+    global _score_cache_size
+    with _score_cache_lock:
+        _score_cache_size = max(_score_cache_size, entries)
+
+
+def clear_score_cache():
+    with _score_cache_lock:
+        _score_cache.clear()
+
+
+def _format_result(article, label_id, score):
+    # Take first 2 lines of content (or truncate if shorter)
+    snippet = " ".join(article["content"].split(". ")[:2])
 
-def analyze_sentiment(articles):
+    return {
+        "title": article["title"],
+        "snippet": snippet,
+        "url": article["url"],
+        "sentiment": LABELS[label_id],
+        "score": round(score, 4)
+    }
+
+
+def score_texts(texts, max_batch_size=None, sentiment_model=None):
     """
-    Perform sentiment analysis on a list of articles using FinBERT.
+    Run FinBERT over a list of texts in length-sorted dynamic batches.
+
+    Texts are tokenized once without padding, sorted by token length and
+    split into batches of at most `max_batch_size`, so each batch is only
+    padded to its own longest member instead of a fixed 512 tokens.
+
+    Args:
+        texts (list[str]): Texts to classify.
+        max_batch_size (int, optional): Upper bound on texts per forward pass.
+        sentiment_model (tuple, optional): (tokenizer, model) to use instead of the shared one.
+
+    Returns:
+        list[tuple[int, float]]: (label_id, probability) per text, in input order.
+    """
+    if not texts:
+        return []
+
+    tokenizer, model = sentiment_model or get_sentiment_model()
+    max_batch_size = max_batch_size or MAX_BATCH_SIZE
+    encoded = tokenizer(texts, truncation=True, max_length=MAX_LENGTH)["input_ids"]
+    order = sorted(range(len(texts)), key=lambda i: len(encoded[i]))
+
+    results = [None] * len(texts)
+    with torch.inference_mode():
+        for start in range(0, len(order), max_batch_size):
+            batch_ids = order[start:start + max_batch_size]
+            batch = tokenizer.pad(
+                {"input_ids": [encoded[i] for i in batch_ids]},
+                padding="longest",
+                return_tensors="pt"
+            )
+            logits = model(**batch).logits
+
+            probs = F.softmax(logits, dim=-1)
+            scores, label_ids = torch.max(probs, dim=1)
+            for i, label_id, score in zip(batch_ids, label_ids.tolist(), scores.tolist()):
+                results[i] = (label_id, score)
+
+    return results
+
+
+# Direct calls with their own batch size (watchlist, prewarm) and the batching server
+# share the model one pass at a time instead of competing for the cores
+_model_lock = threading.Lock()
+
+
+def _score_serialized(texts, max_batch_size=None):
+    with _model_lock:
+        return score_texts(texts, max_batch_size)
+
+
+# Scoring calls from concurrent requests are coalesced into shared forward passes
+_sentiment_server = MicroBatcher("sentiment", _score_serialized, MAX_BATCH_SIZE)
+
+
+def analyze_sentiment(articles, max_batch_size=None):
+    """
+    Perform sentiment analysis on a list of articles using batched FinBERT inference.
+
+    Articles scored before (same URL and content) are served from a bounded
+    cache; only the rest go through the model, coalesced with other requests'
+    articles by the micro-batching server unless `max_batch_size` is given.
 
     Args:
         articles (list[dict]): List of articles with keys 'title', 'content', 'url'.
+        max_batch_size (int, optional): Upper bound on articles per forward pass.
+            Defaults to SENTIMENT_MAX_BATCH_SIZE.
 
     Returns:
         list[dict]: List of formatted results with sentiment label and score.
     """
+    keys = [_score_key(article) for article in articles]
+    scores = {}
+    with _score_cache_lock:
+        for key in keys:
+            if key in _score_cache:
+                _score_cache.move_to_end(key)
+                scores[key] = _score_cache[key]
+
+    missing = list(dict.fromkeys(key for key in keys if key not in scores))
+    if missing:
+        texts = {key: article["content"] for key, article in zip(keys, articles)}
+        to_score = [texts[key] for key in missing]
+        if max_batch_size is None and MICRO_BATCH_ENABLED:
+            scored = _sentiment_server.run(to_score)
+        else:
+            scored = _score_serialized(to_score, max_batch_size)
+        scores.update(zip(missing, scored))
+
+        with _score_cache_lock:
+            for key in missing:
+                _score_cache[key] = scores[key]
+            while len(_score_cache) > _score_cache_size:
+                _score_cache.popitem(last=False)
+
+    with _score_cache_lock:
+        sentiment_stats["cache_hits"] += len(keys) - len(missing)
+        sentiment_stats["scored"] += len(missing)
+    return [_format_result(article, *scores[key]) for article, key in zip(articles, keys)]
+
+
+def analyze_sentiment_sequential(articles):
+    """
+    Perform sentiment analysis one article at a time (the original loop).
+
+    Kept as the reference implementation for parity checks and benchmarks.
+
+    Args:
+        articles (list[dict]): List of articles with keys 'title', 'content', 'url'.
+
+    Returns:
+        list[dict]: List of formatted results with sentiment label and score.
+    """
+    tokenizer, model = get_sentiment_model()
     results = []
 
     for article in articles:
-        # Take first 2 lines of content (or truncate if shorter)
-        snippet = " ".join(article["content"].split(". ")[:2])
-
         # Encode content for sentiment analysis
-        inputs = tokenizer(article["content"], return_tensors="pt", truncation=True, max_length=512)
+        inputs = tokenizer(article["content"], return_tensors="pt", truncation=True, max_length=MAX_LENGTH)
         outputs = model(**inputs)
 
         # Convert logits to probabilities
         probs = F.softmax(outputs.logits, dim=-1)
         score, label_id = torch.max(probs, dim=1)
 
-        sentiment_label = LABELS[label_id.item()]
-        sentiment_score = score.item()
-
-        # Format result
-        results.append({
-            "title": article["title"],
-            "snippet": snippet,
-            "url": article["url"],
-            "sentiment": sentiment_label,
-            "score": round(sentiment_score, 4)
-        })
+        results.append(_format_result(article, label_id.item(), score.item()))
 
     return results
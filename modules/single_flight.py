@@ -0,0 +1,108 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+# Results of symbol-scoped pipeline steps are shared for this many seconds after they finish
+SINGLE_FLIGHT_WINDOW = float(os.getenv("SINGLE_FLIGHT_WINDOW", "15"))
+SINGLE_FLIGHT_MAX_KEYS = 1024
+
+# Leader tasks of async flights; the event loop only keeps weak references to tasks
+_leader_tasks = set()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key (the leader) runs the work; callers arriving
+    while it is in flight, or within `window` seconds after it succeeded,
+    get the same result (or exception) instead of running it again. Failed
+    results are never reused. Works for sync callers (`do`) and async ones
+    (`ado`); an async leader's work runs as its own task, so a cancelled
+    request does not cancel it for the others.
+    """
+
+    def __init__(self, window=SINGLE_FLIGHT_WINDOW, max_keys=SINGLE_FLIGHT_MAX_KEYS):
+        self.window = window
+        self.max_keys = max_keys
+        self.stats = {"executions": 0, "shared": 0}
+        self._flights = {}  # key -> {"future": Future, "done_at": float | None}
+        self._lock = threading.Lock()
+
+    def _join_or_lead(self, key):
+        now = time.monotonic()
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                if not flight["future"].done() or now - flight["done_at"] < self.window:
+                    self.stats["shared"] += 1
+                    return flight["future"], False
+
+            future = Future()
+            self._flights[key] = {"future": future, "done_at": None}
+            self.stats["executions"] += 1
+            if len(self._flights) > self.max_keys:
+                self._prune(now)
+            return future, True
+
+    def _prune(self, now):
+        expired = [
+            key for key, flight in self._flights.items()
+            if flight["future"].done() and now - flight["done_at"] >= self.window
+        ]
+        for key in expired:
+            del self._flights[key]
+
+    def _settle(self, key, future, result=None, error=None):
+        with self._lock:
+            if error is not None:
+                # Don't hand a failure to later callers
+                if self._flights.get(key, {}).get("future") is future:
+                    del self._flights[key]
+            else:
+                self._flights[key]["done_at"] = time.monotonic()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn):
+        """
+        Run `fn()` for `key`, or wait for and return the in-flight/fresh result.
+        """
+        future, leader = self._join_or_lead(key)
+        if leader:
+            # BaseException too: an interrupted leader must not leave the key in flight forever
+            try:
+                self._settle(key, future, result=fn())
+            except BaseException as e:
+                self._settle(key, future, error=e)
+                raise
+        return future.result()
+
+    async def ado(self, key, afn):
+        """
+        Async variant of `do`: `afn()` returns the awaitable doing the work.
+        """
+        future, leader = self._join_or_lead(key)
+        if leader:
+            async def lead():
+                try:
+                    self._settle(key, future, result=await afn())
+                except BaseException as e:
+                    # Cancellation included, so waiters are released and the key is dropped
+                    self._settle(key, future, error=e)
+                    if not isinstance(e, Exception):
+                        raise
+            task = asyncio.get_running_loop().create_task(lead())
+            _leader_tasks.add(task)
+            task.add_done_callback(_leader_tasks.discard)
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+
+# Symbol-scoped ingestion steps of the stock workflow (prices, news, embeddings)
+symbol_flights = SingleFlight()
+# Identical LLM prompts in flight at the same time (the response cache covers later ones)
+llm_flights = SingleFlight(window=0)
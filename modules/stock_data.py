@@ -1,26 +1,48 @@
-import yfinance as yf
+from modules.price_store import get_recent_bars
+from modules.ticker_resolver import is_known_symbol, resolve
 
-def get_stock_data(stock_symbol):
-    stock_symbol = stock_symbol.strip().replace(" ", "").upper()
-    if not stock_symbol.endswith(".NS"):
-        stock_symbol += ".NS"
+def normalize_symbol(stock_symbol):
+    """
+    Turn a symbol or extracted stock name into the yfinance ticker (e.g. "tcs" -> "TCS.NS").
 
-    try:
-        stock = yf.Ticker(stock_symbol)
-        hist = stock.history(period="7d")
+    Names in the bundled NSE list are mapped to their symbol ("tata motors" -> "TATAMOTORS.NS"),
+    tickers that already carry an exchange suffix (".NS", ".BO") are kept as they are.
+    """
+    cleaned = stock_symbol.strip().replace(" ", "").upper()
+    if cleaned.endswith((".NS", ".BO")):
+        return cleaned
+    if is_known_symbol(cleaned):
+        return cleaned + ".NS"
+
+    match = resolve(stock_symbol)
+    if match is not None and match.confidence == 1.0:
+        return match.symbol + ".NS"
+    return cleaned + ".NS"
 
-        if hist.empty:
-            print(f"No data found for symbol: {stock_symbol}")
-            return []  # ✅ Return empty list instead of None
+def stock_records(hist, stock_symbol):
+    """
+    Turn a frame of daily bars into the OHLCV records returned by the API.
+    """
+    if hist.empty:
+        print(f"No data found for symbol: {stock_symbol}")
+        return []  # ✅ Return empty list instead of None
+
+    required_cols = ['Open', 'Close', 'High', 'Low', 'Volume']
+    missing_cols = [col for col in required_cols if col not in hist.columns]
+    if missing_cols:
+        print(f"Missing columns {missing_cols} in data for {stock_symbol}")
+        return []
 
-        required_cols = ['Open', 'Close', 'High', 'Low', 'Volume']
-        missing_cols = [col for col in required_cols if col not in hist.columns]
-        if missing_cols:
-            print(f"Missing columns {missing_cols} in data for {stock_symbol}")
-            return []
+    selected = hist[required_cols]
+    return selected.to_dict(orient="records")
 
-        selected = hist[required_cols]
-        return selected.to_dict(orient="records")
+
+def get_stock_data(stock_symbol):
+    stock_symbol = normalize_symbol(stock_symbol)
+
+    try:
+        # Served from the local price store, which fetches only bars it doesn't have yet
+        return stock_records(get_recent_bars(stock_symbol, days=7), stock_symbol)
 
     except Exception as e:
         print(f"Error fetching stock data: {e}")
@@ -0,0 +1,162 @@
+import csv
+import difflib
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# Bundled NSE symbol / company list used to resolve queries without an LLM call
+SYMBOLS_PATH = os.path.join(os.path.dirname(__file__), "data", "nse_symbols.csv")
+# Matches below this confidence fall back to the LLM extractor
+RESOLVER_MIN_CONFIDENCE = float(os.getenv("RESOLVER_MIN_CONFIDENCE", "0.85"))
+
+MAX_NGRAM = 6
+# Trailing words dropped to build short company-name keys ("Infosys Limited" -> "infosys")
+NAME_SUFFIXES = {"ltd", "limited", "india", "industries", "company", "corporation", "co", "the", "of", "and"}
+# Symbols and names that are also everyday words only match when written in capitals
+COMMON_WORD_SYMBOLS = {"idea", "sail", "hero", "trent", "titan"}
+# Query words never worth a fuzzy comparison on their own
+STOPWORDS = {
+    "what", "is", "are", "the", "about", "of", "for", "on", "in", "to", "a", "an", "me", "give", "show",
+    "tell", "insights", "insight", "stock", "stocks", "share", "shares", "price", "news", "latest",
+    "today", "analysis", "should", "i", "buy", "sell", "hold", "how", "doing", "outlook", "and", "please"
+}
+
+Match = namedtuple("Match", ["symbol", "name", "confidence"])
+
+_index = None  # normalized key -> (symbol, name, is_symbol_key)
+_companies = {}  # symbol -> company name
+_sectors = {}  # symbol -> bundled sector label
+
+
+def _normalize(text):
+    text = text.lower().replace("'", "")
+    return " ".join(re.sub(r"[^a-z0-9&\-]+", " ", text).split())
+
+
+def _short_name(key):
+    words = key.split()
+    while len(words) > 1 and words[-1] in NAME_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def _load_index():
+    global _index
+    if _index is not None:
+        return _index
+
+    index = {}
+    with open(SYMBOLS_PATH, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            symbol, name = row["symbol"].strip().upper(), row["name"].strip()
+            _companies[symbol] = name
+            if row.get("sector"):
+                _sectors[symbol] = row["sector"].strip()
+
+            names = [name] + [alias for alias in (row.get("aliases") or "").split("|") if alias.strip()]
+            for text in names:
+                key = _normalize(text)
+                for variant in (key, _short_name(key)):
+                    index.setdefault(variant, (symbol, name, False))
+            index.setdefault(_normalize(symbol), (symbol, name, True))
+
+    _index = index
+    return _index
+
+
+def _ngrams(tokens, n):
+    return [(i, " ".join(tokens[i:i + n])) for i in range(len(tokens) - n + 1)]
+
+
+def company_name(symbol):
+    """
+    Return the company name for a known NSE symbol (without exchange suffix), or None.
+    """
+    _load_index()
+    return _companies.get(symbol.upper().split(".")[0])
+
+
+def bundled_sector(symbol):
+    """
+    Return the sector from the bundled NSE list for a symbol (without exchange suffix), or None.
+    """
+    _load_index()
+    return _sectors.get(symbol.upper().split(".")[0])
+
+
+def is_known_symbol(symbol):
+    """
+    True if the symbol (without exchange suffix) is in the bundled NSE list.
+    """
+    return company_name(symbol) is not None
+
+
+@lru_cache(maxsize=4096)
+def resolve(text):
+    """
+    Resolve free text (a user query or an extracted company name) to an NSE symbol.
+
+    Every n-gram of the text is first looked up in an exact index of
+    symbols, company names and aliases (longest n-gram wins, confidence 1.0).
+    If nothing matches exactly, n-grams are fuzzy-matched against the
+    company names and the best similarity ratio is used as the confidence.
+
+    Args:
+        text (str): Query or company name, e.g. "insights about Tata Motors".
+
+    Returns:
+        Match | None: (symbol, name, confidence), or None if nothing is close.
+    """
+    if not text:
+        return None
+
+    index = _load_index()
+    original = text.replace("'", "").split()
+    tokens = _normalize(text).split()
+    capitals = {_normalize(word) for word in original if word.isupper()}
+
+    for n in range(min(MAX_NGRAM, len(tokens)), 0, -1):
+        for _, gram in _ngrams(tokens, n):
+            hit = index.get(gram)
+            if hit is None:
+                continue
+            # Whether it was indexed as a symbol or a (short) name: "titan", "trent" and "hero" are both
+            if gram in COMMON_WORD_SYMBOLS and gram not in capitals:
+                continue
+            symbol, name, _ = hit
+            return Match(symbol, name, 1.0)
+
+    # Fuzzy fallback for typos such as "infosis" or "relaince industries"
+    name_keys = [
+        key for key, (_, _, is_symbol_key) in index.items()
+        if not is_symbol_key and len(key) >= 4 and key not in COMMON_WORD_SYMBOLS
+    ]
+    best = None
+    for n in range(min(MAX_NGRAM, len(tokens)), 0, -1):
+        for _, gram in _ngrams(tokens, n):
+            if len(gram) < 4 or all(word in STOPWORDS for word in gram.split()):
+                continue
+            # "a hero to many" must not fuzzy-match "hero moto"
+            if any(word in COMMON_WORD_SYMBOLS and word not in capitals for word in gram.split()):
+                continue
+            for key in difflib.get_close_matches(gram, name_keys, n=1, cutoff=0.75):
+                ratio = difflib.SequenceMatcher(None, gram, key).ratio()
+                if best is None or ratio > best.confidence:
+                    symbol, name, _ = index[key]
+                    best = Match(symbol, name, round(ratio, 3))
+
+    return best
+
+
+def news_search_term(stock_symbol):
+    """
+    Build the NewsAPI query for a symbol: the quoted company name plus the ticker when known.
+    """
+    symbol = stock_symbol.strip().upper().split(".")[0]
+    name = company_name(symbol)
+    if name is None:
+        return stock_symbol
+    if len(symbol) >= 3 and symbol.isalpha() and _normalize(symbol) != _normalize(name):
+        return f'"{name}" OR {symbol}'
+    return f'"{name}"'
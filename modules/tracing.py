@@ -0,0 +1,127 @@
+import asyncio
+import contextvars
+import functools
+import time
+
+from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+
+NODE_SECONDS = Histogram(
+    "deepstock_node_duration_seconds", "Wall time of one graph node run",
+    ["workflow", "node"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+NODE_ERRORS = Counter(
+    "deepstock_node_errors_total", "Graph node runs that raised",
+    ["workflow", "node", "error"]
+)
+NODE_ITEMS = Histogram(
+    "deepstock_node_output_items", "Length of list fields (articles, results, bars) returned by a node",
+    ["workflow", "node", "field"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200)
+)
+LLM_SECONDS = Histogram(
+    "deepstock_llm_call_seconds", "Latency of one LLM call, excluding rate-limit waits",
+    ["provider"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+)
+LLM_PROMPT_CHARS = Histogram(
+    "deepstock_llm_prompt_chars", "Prompt length in characters",
+    ["provider"],
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+)
+LLM_PROMPT_TOKENS = Histogram(
+    "deepstock_llm_prompt_tokens", "Estimated prompt tokens",
+    ["provider"],
+    buckets=(64, 128, 256, 512, 1000, 2000, 4000, 8000, 16000)
+)
+BATCH_ITEMS = Histogram(
+    "deepstock_inference_batch_items", "Items per coalesced inference batch (see modules/micro_batcher.py)",
+    ["server"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+VECTOR_EVICTIONS = Counter(
+    "deepstock_vector_evictions_total", "Articles deleted from the news embeddings collection by retention",
+    ["reason"]
+)
+
+# Per-request breakdown, only collected while a request has called start_request_timings()
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def start_request_timings():
+    """
+    Start collecting node and LLM timings for the current request (task context).
+    """
+    timings = {"nodes": [], "llm_calls": []}
+    _request_timings.set(timings)
+    return timings
+
+
+def _record_node(workflow, node, started, update=None, error=None):
+    seconds = time.perf_counter() - started
+    NODE_SECONDS.labels(workflow, node).observe(seconds)
+    entry = {"node": node, "seconds": round(seconds, 4)}
+
+    if error is not None:
+        NODE_ERRORS.labels(workflow, node, type(error).__name__).inc()
+        entry["error"] = type(error).__name__
+    elif isinstance(update, dict):
+        for field, value in update.items():
+            if isinstance(value, list):
+                NODE_ITEMS.labels(workflow, node, field).observe(len(value))
+                entry[field] = len(value)
+
+    timings = _request_timings.get()
+    if timings is not None:
+        timings["nodes"].append(entry)
+
+
+def record_llm_call(provider, prompt_chars, prompt_tokens, seconds):
+    LLM_SECONDS.labels(provider).observe(seconds)
+    LLM_PROMPT_CHARS.labels(provider).observe(prompt_chars)
+    LLM_PROMPT_TOKENS.labels(provider).observe(prompt_tokens)
+
+    timings = _request_timings.get()
+    if timings is not None:
+        timings["llm_calls"].append({
+            "provider": provider,
+            "seconds": round(seconds, 4),
+            "prompt_tokens": prompt_tokens
+        })
+
+
+def traced(workflow, node, func):
+    """
+    Wrap a (sync or async) graph node so its duration, errors and output sizes are recorded.
+    """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(state):
+            started = time.perf_counter()
+            try:
+                update = await func(state)
+            except Exception as e:
+                _record_node(workflow, node, started, error=e)
+                raise
+            _record_node(workflow, node, started, update)
+            return update
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(state):
+        started = time.perf_counter()
+        try:
+            update = func(state)
+        except Exception as e:
+            _record_node(workflow, node, started, error=e)
+            raise
+        _record_node(workflow, node, started, update)
+        return update
+    return wrapper
+
+
+def metrics_payload():
+    """
+    Return (body, content type) of the Prometheus text exposition.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,8 +1,14 @@
 import os
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.messages import HumanMessage
 
+from modules.ticker_resolver import resolve, RESOLVER_MIN_CONFIDENCE
+from modules.rate_limiter import rate_limited
+from modules.executors import run_blocking
+
 # Load environment variables
 load_dotenv()
 
@@ -10,26 +16,17 @@ load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 # Initialize Gemini LLM
-llm = ChatGoogleGenerativeAI(
+llm = rate_limited(ChatGoogleGenerativeAI(
     model="gemini-2.5-flash",
     google_api_key=GEMINI_API_KEY,
     temperature=0  # strict factual extraction
-)
-
-def extract_stock_symbol(query: str) -> str:
-    """
-    Extract the stock/company name from a user query using Gemini LLM.
-
-    Args:
-        query (str): User input query (e.g., "What are the insights about TCS?")
+), "gemini")
 
-    Returns:
-        str: Extracted stock name or None if not found
-    """
+def _symbol_prompt(query):
     if not query or not isinstance(query, str):
         raise ValueError("Query must be a non-empty string.")
 
-    prompt = f"""
+    return f"""
     You are a financial assistant. Extract ONLY the stock name or company name from this query.
     Rules:
     - Return ONLY the name like "Tata Motors" or "AAPL".
@@ -39,15 +36,119 @@ def extract_stock_symbol(query: str) -> str:
     Query: {query}
     """
 
+
+def _parse_stock_name(content):
+    stock_name = content.strip()
+
+    if stock_name.lower() in ["none", "null", ""]:
+        print("No valid stock name found in query.")
+        return None
+    return stock_name.lower()
+
+
+# Memoized LLM extractions (query -> resolved name), bounded LRU
+LLM_MEMO_SIZE = 1024
+_llm_memo = OrderedDict()
+_llm_memo_lock = threading.Lock()
+
+
+def _memo_key(query):
+    return " ".join(query.lower().split())
+
+
+def _memo_get(query):
+    key = _memo_key(query)
+    with _llm_memo_lock:
+        if key in _llm_memo:
+            _llm_memo.move_to_end(key)
+            return True, _llm_memo[key]
+    return False, None
+
+
+def _memo_put(query, name):
+    key = _memo_key(query)
+    with _llm_memo_lock:
+        _llm_memo[key] = name
+        _llm_memo.move_to_end(key)
+        while len(_llm_memo) > LLM_MEMO_SIZE:
+            _llm_memo.popitem(last=False)
+
+
+def _resolve_locally(text):
+    match = resolve(text)
+    if match is not None and match.confidence >= RESOLVER_MIN_CONFIDENCE:
+        return match.symbol
+    return None
+
+
+def _resolve_extracted(stock_name):
+    # Map the LLM's answer onto the bundled NSE list when possible ("tata motors" -> "TATAMOTORS")
+    if stock_name is None:
+        return None
+    return _resolve_locally(stock_name) or stock_name
+
+
+def extract_stock_symbol(query: str) -> str:
+    """
+    Extract the stock symbol from a user query.
+
+    The query is first resolved against the bundled NSE symbol list; Gemini
+    is only called when that match is missing or low-confidence, and its
+    answers are memoized per query.
+
+    Args:
+        query (str): User input query (e.g., "What are the insights about TCS?")
+
+    Returns:
+        str: NSE symbol (e.g. "TCS"), the extracted stock name if it is not in the list, or None if not found
+    """
+    prompt = _symbol_prompt(query)
+
+    symbol = _resolve_locally(query)
+    if symbol:
+        return symbol
+
+    found, stock_name = _memo_get(query)
+    if found:
+        return stock_name
+
     try:
         response = llm.invoke([HumanMessage(content=prompt)])
-        stock_name = response.content.strip()
+        stock_name = _resolve_extracted(_parse_stock_name(response.content))
+        _memo_put(query, stock_name)
+        return stock_name
 
+    except Exception as e:
+        print(f"Error extracting stock name: {e}")
+        return None
+
+
+async def aextract_stock_symbol(query: str) -> str:
+    """
+    Async variant of extract_stock_symbol using `llm.ainvoke` for the fallback.
+
+    Args:
+        query (str): User input query (e.g., "What are the insights about TCS?")
 
-        if stock_name.lower() in ["none", "null", ""]:
-            print("No valid stock name found in query.")
-            return None
-        return stock_name.lower()
+    Returns:
+        str: NSE symbol (e.g. "TCS"), the extracted stock name if it is not in the list, or None if not found
+    """
+    prompt = _symbol_prompt(query)
+
+    # The fuzzy fallback scans every company name, keep it off the event loop
+    symbol = await run_blocking(_resolve_locally, query)
+    if symbol:
+        return symbol
+
+    found, stock_name = _memo_get(query)
+    if found:
+        return stock_name
+
+    try:
+        response = await llm.ainvoke([HumanMessage(content=prompt)])
+        stock_name = await run_blocking(_resolve_extracted, _parse_stock_name(response.content))
+        _memo_put(query, stock_name)
+        return stock_name
 
     except Exception as e:
         print(f"Error extracting stock name: {e}")
@@ -0,0 +1,144 @@
+import os
+import time
+
+from modules.model_registry import get_news_collection, CHROMA_MODE, CHROMA_PERSIST_DIR
+from modules.executors import run_blocking, PeriodicTask
+from modules.tracing import VECTOR_EVICTIONS
+
+# Articles published more than this many days ago are evicted (keep >= NEWS_WINDOW_DAYS, 0 disables)
+NEWS_RETENTION_DAYS = int(os.getenv("NEWS_RETENTION_DAYS", "60"))
+# Newest articles kept per symbol partition (0 disables the cap)
+NEWS_MAX_PER_SYMBOL = int(os.getenv("NEWS_MAX_PER_SYMBOL", "300"))
+# Seconds between background compactions (0 disables the job)
+NEWS_COMPACTION_INTERVAL = float(os.getenv("NEWS_COMPACTION_INTERVAL", "3600"))
+
+# Rows read / ids deleted per collection call, below Chroma's max batch size
+COMPACTION_PAGE_SIZE = 5000
+# Chroma's default HNSW graph degree (hnsw:M), used for the index memory estimate
+HNSW_M = 16
+
+_evictions = {"expired": 0, "over_cap": 0}
+
+
+def retention_cutoff(retention_days=NEWS_RETENTION_DAYS):
+    """
+    Epoch seconds before which an article is expired, None when age retention is disabled.
+    """
+    if not retention_days:
+        return None
+    return int(time.time()) - retention_days * 86400
+
+
+def _scan(collection):
+    # Metadata only; the embeddings are never loaded
+    for offset in range(0, collection.count(), COMPACTION_PAGE_SIZE):
+        page = collection.get(include=["metadatas"], limit=COMPACTION_PAGE_SIZE, offset=offset)
+        for doc_id, metadata in zip(page["ids"], page["metadatas"]):
+            yield doc_id, metadata or {}
+
+
+def _delete(collection, ids):
+    for start in range(0, len(ids), COMPACTION_PAGE_SIZE):
+        collection.delete(ids=ids[start:start + COMPACTION_PAGE_SIZE])
+
+
+def compact(retention_days=NEWS_RETENTION_DAYS, max_per_symbol=NEWS_MAX_PER_SYMBOL):
+    """
+    Apply the retention policy to the news embeddings collection.
+
+    Articles published before the retention window (or without a publication
+    time) are deleted, then each symbol partition is trimmed to its newest
+    `max_per_symbol` articles.
+
+    Returns:
+        dict: 'expired' and 'over_cap' counts of deleted articles, and the remaining 'count'.
+    """
+    collection = get_news_collection()
+    cutoff = retention_cutoff(retention_days)
+
+    expired, by_symbol = [], {}
+    for doc_id, metadata in _scan(collection):
+        published_ts = metadata.get("published_ts", 0)
+        if cutoff is not None and published_ts < cutoff:
+            expired.append(doc_id)
+        else:
+            by_symbol.setdefault(metadata.get("symbol", ""), []).append((published_ts, doc_id))
+
+    over_cap = []
+    if max_per_symbol:
+        for entries in by_symbol.values():
+            if len(entries) > max_per_symbol:
+                entries.sort(reverse=True)
+                over_cap.extend(doc_id for _, doc_id in entries[max_per_symbol:])
+
+    _delete(collection, expired + over_cap)
+
+    _evictions["expired"] += len(expired)
+    _evictions["over_cap"] += len(over_cap)
+    VECTOR_EVICTIONS.labels("expired").inc(len(expired))
+    VECTOR_EVICTIONS.labels("over_cap").inc(len(over_cap))
+    if expired or over_cap:
+        print(f"Vector store compaction evicted {len(expired)} expired and {len(over_cap)} over-cap articles")
+
+    return {"expired": len(expired), "over_cap": len(over_cap), "count": collection.count()}
+
+
+async def _compact_job():
+    await run_blocking(compact)
+
+
+_job = PeriodicTask("Vector store compaction", _compact_job, NEWS_COMPACTION_INTERVAL)
+
+
+def start():
+    """
+    Start the background compaction loop on the running event loop (no-op when disabled).
+    """
+    if NEWS_COMPACTION_INTERVAL > 0:
+        return _job.start()
+    return None
+
+
+async def stop():
+    await _job.stop()
+
+
+def _dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def stats():
+    """
+    Size of the news embeddings collection, estimated HNSW index memory and eviction counts.
+
+    The index estimate is float32 vectors plus level-0 graph links per
+    document; on-disk size is reported for the persistent store only.
+    """
+    collection = get_news_collection()
+    count = collection.count()
+
+    dimension = 0
+    if count:
+        sample = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        dimension = len(sample[0]) if sample is not None and len(sample) else 0
+
+    return {
+        "count": count,
+        "dimension": dimension,
+        "index_memory_bytes": count * (dimension * 4 + 2 * HNSW_M * 4),
+        "disk_bytes": _dir_bytes(CHROMA_PERSIST_DIR) if CHROMA_MODE != "memory" else None,
+        "policy": {
+            "retention_days": NEWS_RETENTION_DAYS,
+            "max_per_symbol": NEWS_MAX_PER_SYMBOL,
+            "compaction_interval_seconds": NEWS_COMPACTION_INTERVAL
+        },
+        "evictions": dict(_evictions),
+        "compactions": {**_job.stats, "running": _job.running}
+    }
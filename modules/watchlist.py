@@ -0,0 +1,120 @@
+import asyncio
+import os
+
+from modules.price_store import get_histories, recent_bars
+from modules.stock_data import normalize_symbol, stock_records
+from modules.news_fetcher import aget_stock_news
+from modules.embedding import embed_and_store_batch
+from modules.chromadb_handler import search_similar_batch
+from modules.context_compression import compress_context
+from modules.sentiment_analyser1 import analyze_sentiment
+from modules.llm_insights import agenerate_watchlist_insights
+from modules.ticker_resolver import company_name
+from modules.charts import chart_url
+from modules.executors import run_blocking, run_inference
+
+WATCHLIST_MAX_SYMBOLS = int(os.getenv("WATCHLIST_MAX_SYMBOLS", "200"))
+# FinBERT batch size over the combined article pool of a watchlist
+WATCHLIST_SENTIMENT_BATCH_SIZE = int(os.getenv("WATCHLIST_SENTIMENT_BATCH_SIZE", "64"))
+# Symbols covered by one summary/insights LLM call
+WATCHLIST_LLM_BATCH_SIZE = int(os.getenv("WATCHLIST_LLM_BATCH_SIZE", "10"))
+# Batched LLM calls in flight at the same time (the rate limiter still paces them)
+WATCHLIST_LLM_CONCURRENCY = int(os.getenv("WATCHLIST_LLM_CONCURRENCY", "8"))
+
+WATCHLIST_QUERY = "{name} stock outlook, results and analyst views"
+
+
+def _search_query(ticker, query=None):
+    base = ticker.split(".")[0]
+    name = company_name(base) or base
+    return f"{name} {query}" if query else WATCHLIST_QUERY.format(name=name)
+
+
+async def _batch_insights(semaphore, entries):
+    async with semaphore:
+        return await agenerate_watchlist_insights(entries)
+
+
+async def analyze_watchlist(symbols, query=None):
+    """
+    Screen many symbols in one pass instead of one /query per symbol.
+
+    Prices come from one multi-ticker download, news for all symbols is fetched
+    concurrently, and the whole article pool is embedded and scored by FinBERT
+    in large batches. Summaries and insights come from one LLM call per
+    WATCHLIST_LLM_BATCH_SIZE symbols, so LLM time scales with the number of
+    batches rather than symbols.
+
+    Args:
+        symbols (list[str]): Symbols or company names, e.g. ["TCS", "INFY"].
+        query (str, optional): Focus of the news search, e.g. "order book".
+
+    Returns:
+        list[dict]: One QueryResponse-shaped result per distinct symbol, in input order.
+    """
+    tickers = list(dict.fromkeys(normalize_symbol(symbol) for symbol in symbols))
+    bases = {ticker: ticker.split(".")[0] for ticker in tickers}
+
+    histories, news = await asyncio.gather(
+        run_blocking(get_histories, tickers),
+        asyncio.gather(*(aget_stock_news(bases[ticker]) for ticker in tickers))
+    )
+    articles = dict(zip(tickers, news))
+
+    await run_inference(embed_and_store_batch, articles)
+    similar = await run_inference(
+        search_similar_batch,
+        {ticker: _search_query(ticker, query) for ticker in tickers if articles[ticker]},
+        include_embeddings=True
+    )
+
+    # One FinBERT pass over every symbol's retrieved articles
+    pool = [article for ticker in tickers for article in similar.get(ticker, [])]
+    scored = await run_inference(analyze_sentiment, pool, WATCHLIST_SENTIMENT_BATCH_SIZE)
+
+    sentiment, context, offset = {}, {}, 0
+    for ticker in tickers:
+        count = len(similar.get(ticker, []))
+        sentiment[ticker] = scored[offset:offset + count]
+        offset += count
+        context[ticker] = compress_context(similar.get(ticker, []))[0]
+
+    stock_data = {ticker: stock_records(recent_bars(histories.get(ticker)), ticker) for ticker in tickers}
+
+    # Symbols with neither prices nor news get no LLM call
+    to_generate = [ticker for ticker in tickers if stock_data[ticker] or context[ticker]]
+    batches = [
+        {ticker: {"stock_data": stock_data[ticker], "articles": context[ticker]} for ticker in chunk}
+        for chunk in (to_generate[i:i + WATCHLIST_LLM_BATCH_SIZE]
+                      for i in range(0, len(to_generate), WATCHLIST_LLM_BATCH_SIZE))
+    ]
+    semaphore = asyncio.Semaphore(WATCHLIST_LLM_CONCURRENCY)
+    answers = await asyncio.gather(*(_batch_insights(semaphore, batch) for batch in batches), return_exceptions=True)
+
+    generated = {}
+    for batch, answer in zip(batches, answers):
+        for ticker in batch:
+            if isinstance(answer, Exception):
+                generated[ticker] = answer
+            else:
+                generated[ticker] = answer.get(ticker, ValueError("No insights returned for this symbol"))
+
+    results = []
+    for ticker in tickers:
+        outcome = generated.get(ticker, ("No recent news found.", ""))
+        result = {
+            "stock_symbol": bases[ticker],
+            "stock_data": stock_data[ticker],
+            "chart_url": chart_url(ticker) if stock_data[ticker] else "",
+            "sentiment_results": sentiment[ticker],
+            "news_summary": "",
+            "insights": ""
+        }
+        if isinstance(outcome, Exception):
+            print(f"Error generating insights for {ticker}: {outcome}")
+            result["error"] = str(outcome)
+        else:
+            result["news_summary"], result["insights"] = outcome
+        results.append(result)
+
+    return results
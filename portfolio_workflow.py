@@ -1,13 +1,20 @@
 from langgraph.graph import StateGraph, END
-from pydantic import BaseModel
+from langchain_core.runnables import RunnableLambda
+from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
-import matplotlib.pyplot as plt
-import io, base64
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
 import os
 from dotenv import load_dotenv
-import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.charts import register_sector_chart, sector_chart_url
+from modules.sector_classifier import classify_sectors, aclassify_sectors
+from modules.rate_limiter import rate_limited
+from modules.portfolio_analytics import analyze_holdings, analytics_summary
+from modules.executors import run_blocking
+from modules.tracing import traced
 
 # -------------------- Setup --------------------
 
@@ -17,63 +24,86 @@ load_dotenv()
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
 # Initialize model
-llm = ChatOpenAI(
+llm = rate_limited(ChatOpenAI(
     model="gpt-4o-mini",
     temperature=0.7,
     base_url="https://openrouter.ai/api/v1",
     api_key=OPENROUTER_API_KEY,
-)
+), "openrouter")
 
 # -------------------- State --------------------
 class StockInput(BaseModel):
     symbol: str
-    quantity: int
+    quantity: int = Field(gt=0)
 
 class PortfolioWorkflowState(BaseModel):
     portfolio: List[StockInput]
     risk: str
-    sector_breakdown: Dict[str, int] = {}
-    sector_chart_base64: Optional[str] = None
+    sectors: Dict[str, str] = {}
+    analytics: Dict = {}
+    sector_breakdown: Dict[str, float] = {}
+    sector_chart_url: Optional[str] = None
     ai_insights: Optional[str] = None
     recommendations: Optional[str] = None
 
 # -------------------- Sector Analyzer --------------------
+def _sector_result(portfolio, sectors):
+    sectors = {stock.symbol: sectors.get(stock.symbol, "Unknown") for stock in portfolio}
+    return {
+        "sectors": sectors,
+        # Holdings as returned by /portfolio-analysis, with their sector
+        "portfolio": [
+            {"symbol": stock.symbol, "quantity": stock.quantity, "sector": sectors[stock.symbol]}
+            for stock in portfolio
+        ]
+    }
+
 def sector_analyzer(state: PortfolioWorkflowState):
-    stock_details = []
-    sector_data = {}
+    # Cached/bundled sectors first, one batched LLM call for the rest
+    sectors = classify_sectors([stock.symbol for stock in state.portfolio], llm)
+    return _sector_result(state.portfolio, sectors)
+
+async def asector_analyzer(state: PortfolioWorkflowState):
+    sectors = await aclassify_sectors([stock.symbol for stock in state.portfolio], llm)
+    return _sector_result(state.portfolio, sectors)
+
+# -------------------- Portfolio Analytics --------------------
+def _sector_breakdown(state, analytics):
+    # Percent of market value; of share count only when no holding could be priced
+    if analytics["holdings"]:
+        return {sector: round(weight * 100, 2) for sector, weight in analytics["sector_weights"].items()}
 
+    sector_data = {}
     for stock in state.portfolio:
-        prompt = f"""
-        Identify the SECTOR ONLY STRICTLY for this Indian stock symbol: {stock.symbol}.
-        Only return the sector name (e.g., IT, Energy, Banking, FMCG, Pharma, Metals, Auto, Telecom).
-        If unknown, guess based on the company name.
-        """
-        sector = llm.invoke(prompt).content.strip()
-        stock_details.append({"symbol": stock.symbol, "quantity": stock.quantity, "sector": sector})
+        sector = state.sectors.get(stock.symbol, "Unknown")
         sector_data[sector] = sector_data.get(sector, 0) + stock.quantity
+    total = sum(sector_data.values()) or 1
+    return {sector: round(quantity * 100 / total, 2) for sector, quantity in sector_data.items()}
 
-    # Generate pie chart
-    fig, ax = plt.subplots()
-    ax.pie(sector_data.values(), labels=sector_data.keys(), autopct="%1.1f%%")
-    ax.axis("equal")
+def portfolio_analytics(state: PortfolioWorkflowState):
+    analytics = analyze_holdings([(stock.symbol, stock.quantity) for stock in state.portfolio], state.sectors)
+    sector_data = _sector_breakdown(state, analytics)
 
-    buf = io.BytesIO()
-    fig.savefig(buf, format="png")
-    plt.close(fig)
-    buf.seek(0)
-    chart_base64 = base64.b64encode(buf.read()).decode("utf-8")
+    # Pie chart is rendered (and cached) by the /chart/portfolio endpoint
+    chart_id = register_sector_chart(sector_data)
 
     return {
+        "analytics": analytics,
         "sector_breakdown": sector_data,
-        "sector_chart_base64": chart_base64,
-        "portfolio": stock_details
+        "sector_chart_url": sector_chart_url(chart_id)
     }
 
+async def aportfolio_analytics(state: PortfolioWorkflowState):
+    return await run_blocking(portfolio_analytics, state)
+
 # -------------------- Diversification Recommender --------------------
-def diversification_recommender(state: PortfolioWorkflowState):
+def _recommender_prompts(state: PortfolioWorkflowState):
+    # Computed figures only; the LLM interprets them instead of doing the arithmetic
+    summary = analytics_summary(state.analytics)
+
     prompt=f"""
-    The user's portfolio is: {state.portfolio}.
-    Sector allocation: {state.sector_breakdown}.
+    The user's portfolio:
+    {summary}
     Risk appetite: {state.risk}.
 
     Provide in concise bullet points:
@@ -83,8 +113,8 @@ def diversification_recommender(state: PortfolioWorkflowState):
     """
 
     prompt1 = f"""
-    The user's portfolio is: {state.portfolio}.
-    Sector allocation: {state.sector_breakdown}.
+    The user's portfolio:
+    {summary}
     Risk appetite: {state.risk}.
 
     Provide:
@@ -96,21 +126,44 @@ def diversification_recommender(state: PortfolioWorkflowState):
     """
 
 
-    # Example: wait 6 seconds between requests
+    return prompt, prompt1
 
-    response = llm.invoke(prompt).content.strip()
-    time.sleep(6)
-    response1 = llm.invoke(prompt1).content
+def diversification_recommender(state: PortfolioWorkflowState):
+    prompt, prompt1 = _recommender_prompts(state)
+
+    # The two prompts are independent: run them concurrently, the shared rate limiter paces them
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        insights = pool.submit(llm.invoke, prompt)
+        recommendations = pool.submit(llm.invoke, prompt1)
+        response = insights.result().content.strip()
+        response1 = recommendations.result().content
     return {"ai_insights": response, "recommendations": response1}
 
+async def adiversification_recommender(state: PortfolioWorkflowState):
+    prompt, prompt1 = _recommender_prompts(state)
+
+    insights, recommendations = await asyncio.gather(llm.ainvoke(prompt), llm.ainvoke(prompt1))
+    return {"ai_insights": insights.content.strip(), "recommendations": recommendations.content}
+
 # -------------------- Build Workflow --------------------
 graph = StateGraph(PortfolioWorkflowState)
 
-graph.add_node("sector_analyzer", sector_analyzer)
-graph.add_node("diversification_recommender", diversification_recommender)
+graph.add_node("sector_analyzer", RunnableLambda(
+    traced("portfolio", "sector_analyzer", sector_analyzer),
+    afunc=traced("portfolio", "sector_analyzer", asector_analyzer)
+))
+graph.add_node("portfolio_analytics", RunnableLambda(
+    traced("portfolio", "portfolio_analytics", portfolio_analytics),
+    afunc=traced("portfolio", "portfolio_analytics", aportfolio_analytics)
+))
+graph.add_node("diversification_recommender", RunnableLambda(
+    traced("portfolio", "diversification_recommender", diversification_recommender),
+    afunc=traced("portfolio", "diversification_recommender", adiversification_recommender)
+))
 
 graph.set_entry_point("sector_analyzer")
-graph.add_edge("sector_analyzer", "diversification_recommender")
+graph.add_edge("sector_analyzer", "portfolio_analytics")
+graph.add_edge("portfolio_analytics", "diversification_recommender")
 graph.add_edge("diversification_recommender", END)
 
 portfolio_workflow = graph.compile()
@@ -56,15 +56,15 @@ analyzeBtn.addEventListener("click", async () => {
     let html = `<h3>Portfolio Analysis Results</h3>`;
 
     // Chart + Breakdown side by side
-    if (data.sector_chart_base64 || data.sector_breakdown) {
+    if (data.sector_chart_url || data.sector_breakdown) {
       html += `<div class="chart-breakdown">`;
 
       // Chart first
-      if (data.sector_chart_base64) {
+      if (data.sector_chart_url) {
         html += `
 <div class="chart">
 <h4>Sector Chart</h4>
-<img src="data:image/png;base64,${data.sector_chart_base64}"
+<img src="${data.sector_chart_url}"
                  alt="Sector Chart" style="max-width:100%;">
 </div>
         `;
@@ -76,7 +76,7 @@ analyzeBtn.addEventListener("click", async () => {
 <div class="breakdown">
 <h4>Sector Breakdown</h4>
 <table border="1" cellpadding="8" cellspacing="0">
-<thead><tr><th>Sector</th><th>Weight</th></tr></thead>
+<thead><tr><th>Sector</th><th>Weight (%)</th></tr></thead>
 <tbody>
         `;
         for (const [sector, weight] of Object.entries(data.sector_breakdown)) {
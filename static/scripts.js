@@ -1,37 +1,12 @@
 import { marked } from "https://cdn.jsdelivr.net/npm/marked/lib/marked.esm.js";
 
-document.getElementById("queryForm").addEventListener("submit", async function(e) {
-  e.preventDefault();
-
-  const query = document.getElementById("userQuery").value;
-  document.getElementById("loading").style.display = "block";
-  document.getElementById("results").innerHTML = "";
-
-  try {
-    const response = await fetch("http://127.0.0.1:8000/query", {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify({ user_query: query })
-    });
-
-    const data = await response.json();
-    document.getElementById("loading").style.display = "none";
-
-    let html = `
-      <h3>Results</h3>
-      <p><strong>Query:</strong> ${data.query}</p>
-      <p><strong>Stock Symbol:</strong> ${data.stock_symbol}</p>
-    `;
+function renderChart(chartUrl) {
+  return `<h4>Stock Chart</h4>
+      <img src="http://127.0.0.1:8000${chartUrl}" alt="Stock Chart" style="max-width:100%;">`;
+}
 
-    // Chart first
-    if (data.chart_base64) {
-      html += `<h4>Stock Chart</h4>
-      <img src="data:image/png;base64,${data.chart_base64}" alt="Stock Chart" style="max-width:100%;">`;
-    }
-
-    // Then Stock Data Table
-    if (data.stock_data && data.stock_data.length > 0) {
-      html += `<h4>Last 7 days Stock Data</h4>
+function renderStockData(stockData) {
+  let html = `<h4>Last 7 days Stock Data</h4>
       <table border="1" cellpadding="8" cellspacing="0">
       <thead>
         <tr>
@@ -39,33 +14,25 @@ document.getElementById("queryForm").addEventListener("submit", async function(e
         </tr>
       </thead>
       <tbody>`;
-      data.stock_data.forEach(row => {
-        html += `<tr>
+  stockData.forEach(row => {
+    html += `<tr>
           <td>${row.Open.toFixed(2)}</td>
           <td>${row.Close.toFixed(2)}</td>
           <td>${row.High.toFixed(2)}</td>
           <td>${row.Low.toFixed(2)}</td>
           <td>${row.Volume}</td>
         </tr>`;
-      });
-      html += `</tbody></table>`;
-    }
+  });
+  return html + `</tbody></table>`;
+}
 
-    // Then News Summary
-    if (data.news_summary) {
-      html += `<h4>News Summary</h4>
-      <div class="markdown">${marked.parse(data.news_summary)}</div>`;
-    }
+function renderMarkdown(title, text) {
+  return `<h4>${title}</h4>
+      <div class="markdown">${marked.parse(text)}</div>`;
+}
 
-    // Then Insights
-    if (data.insights) {
-      html += `<h4>Insights</h4>
-      <div class="markdown">${marked.parse(data.insights)}</div>`;
-    }
-
-    // Finally Sentiment Results
-    if (data.sentiment_results && data.sentiment_results.length > 0) {
-      html += `<h4>Sentiment Results</h4>
+function renderSentiment(sentimentResults) {
+  let html = `<h4>Sentiment Results</h4>
       <table border="1" cellpadding="8" cellspacing="0">
       <thead>
         <tr>
@@ -73,25 +40,102 @@ document.getElementById("queryForm").addEventListener("submit", async function(e
         </tr>
       </thead>
       <tbody>`;
-      data.sentiment_results.forEach(row => {
-        html += `<tr>
+  sentimentResults.forEach(row => {
+    html += `<tr>
           <td>${row.title}</td>
           <td>${row.snippet}</td>
           <td><a href="${row.url}" target="_blank">Read Article</a></td>
           <td>${row.sentiment}</td>
           <td>${row.score}</td>
         </tr>`;
-      });
-      html += `</tbody></table>`;
-    }
+  });
+  return html + `</tbody></table>`;
+}
+
+// History session of this browser, sent with each query (EventSource can't set X-Session-Id)
+function sessionId() {
+  let id = localStorage.getItem("deepstockSessionId");
+  if (!id) {
+    id = crypto.randomUUID();
+    localStorage.setItem("deepstockSessionId", id);
+  }
+  return id;
+}
+
+document.getElementById("queryForm").addEventListener("submit", function(e) {
+  e.preventDefault();
+
+  const query = document.getElementById("userQuery").value;
+  document.getElementById("loading").style.display = "block";
 
-    document.getElementById("results").innerHTML = html;
+  // Sections are filled in as the server streams each node's result
+  document.getElementById("results").innerHTML = `
+      <h3>Results</h3>
+      <p><strong>Query:</strong> ${query}</p>
+      <p><strong>Stock Symbol:</strong> <span id="resultSymbol">…</span></p>
+      <div id="resultChart"></div>
+      <div id="resultStockData"></div>
+      <div id="resultSummary"></div>
+      <div id="resultInsights"></div>
+      <div id="resultSentiment"></div>
+    `;
+  const section = id => document.getElementById(id);
+  const streamed = { summarize_news: "", generate_insights: "" };
+  const tokenTargets = {
+    summarize_news: ["resultSummary", "News Summary"],
+    generate_insights: ["resultInsights", "Insights"]
+  };
 
-  } catch (error) {
+  const source = new EventSource(`http://127.0.0.1:8000/query/stream?user_query=${encodeURIComponent(query)}&session_id=${encodeURIComponent(sessionId())}`);
+  const finish = () => {
+    source.close();
     document.getElementById("loading").style.display = "none";
-    document.getElementById("results").innerHTML = `<p style="color:red;">Error: ${error.message}</p>`;
-  }
-});
+  };
 
+  source.addEventListener("extract_stock_symbol", event => {
+    section("resultSymbol").textContent = JSON.parse(event.data).stock_symbol;
+  });
 
+  source.addEventListener("generate_chart", event => {
+    const data = JSON.parse(event.data);
+    if (data.chart_url) section("resultChart").innerHTML = renderChart(data.chart_url);
+  });
 
+  source.addEventListener("fetch_stock_data", event => {
+    const data = JSON.parse(event.data);
+    if (data.stock_data && data.stock_data.length > 0) section("resultStockData").innerHTML = renderStockData(data.stock_data);
+  });
+
+  source.addEventListener("sentiment_analysis", event => {
+    const data = JSON.parse(event.data);
+    if (data.sentiment_results && data.sentiment_results.length > 0) {
+      section("resultSentiment").innerHTML = renderSentiment(data.sentiment_results);
+    }
+  });
+
+  // Partial LLM output while the summary / insights are being generated
+  source.addEventListener("token", event => {
+    const data = JSON.parse(event.data);
+    const [id, title] = tokenTargets[data.node];
+    streamed[data.node] += data.text;
+    section(id).innerHTML = renderMarkdown(title, streamed[data.node]);
+  });
+
+  source.addEventListener("summarize_news", event => {
+    const data = JSON.parse(event.data);
+    if (data.news_summary) section("resultSummary").innerHTML = renderMarkdown("News Summary", data.news_summary);
+  });
+
+  source.addEventListener("generate_insights", event => {
+    const data = JSON.parse(event.data);
+    if (data.insights) section("resultInsights").innerHTML = renderMarkdown("Insights", data.insights);
+  });
+
+  source.addEventListener("done", finish);
+
+  source.addEventListener("error", event => {
+    finish();
+    const detail = event.data ? JSON.parse(event.data).detail : "Connection lost";
+    document.getElementById("results").innerHTML += `<p style="color:red;">Error: ${detail}</p>`;
+  });
+});